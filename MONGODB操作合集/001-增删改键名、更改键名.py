@@ -1,24 +1,22 @@
 
+# 增删改键名 / 更改键名
+# 需要长期保留的 schema 修改写成 schema_migrations.py 中的迁移步骤，用本脚本执行：
+#   python 001-增删改键名、更改键名.py --status          # 查看当前版本与待执行的迁移
+#   python 001-增删改键名、更改键名.py                   # 执行所有待执行的迁移（中断后重跑会从检查点继续）
+#   python 001-增删改键名、更改键名.py --to 1 --pause 0.2 --batch-size 500
+# 下方注释掉的 update_many 为一次性的临时操作示例（无版本记录、不分批，大集合上慎用）
 from pymongo import MongoClient
-import pprint
-import os
-import shutil
+import argparse
 from datetime import datetime, timezone
 import json
 
-# 读取配置文件
-with open("config.json", "r") as f:
-    config = json.load(f)["mongodb"]
-
-client = MongoClient(config["uri"])
-collection = client[config["db_name"]][config["collection_name"]]
+from schema_migrations import (MIGRATIONS, BATCH_SIZE, BATCH_PAUSE, state_collection, get_state,
+                               pending_migrations, migrate)
 
 # 获取当前 UTC 时间，并格式化为带时区的 ISO 格式（保留到分钟）
 # %z 会自动添加 +00:00 标识（UTC 时区）
 current_utc_time = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M%z")
 
-print(f"国际通用时间: {current_utc_time}")
-
 # ================================强行加入键值对
 
 # collection.update_many(
@@ -31,12 +29,35 @@ print(f"国际通用时间: {current_utc_time}")
 #             {"$unset": {"datatime": ""}}  # 删除 datatime 字段
 #         )
 
-# ================================修改键值名
-
-# collection.update_many(
-#     {},  # 匹配所有文档
-#     {"$rename": {
-#         "structure.Superconductivity_related_properties.Energy_above_hull":
-#         "structure.Superconductivity_related_properties.energy_above_hull"
-#     }}
-# )
+# ================================datatime 字符串转为 BSON 日期、Energy_above_hull 改名
+# 已改为迁移步骤 v1 / v2（见 schema_migrations.py），不再手动执行 update_many
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="按版本执行 schema 迁移")
+    parser.add_argument("--status", action="store_true", help="只显示当前版本与待执行的迁移")
+    parser.add_argument("--to", type=int, default=None, help="只迁移到该版本")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="每批处理的文档数（按 _id 区间）")
+    parser.add_argument("--pause", type=float, default=BATCH_PAUSE, help="每批之间暂停的秒数")
+    args = parser.parse_args()
+
+    # 读取配置文件
+    with open("config.json", "r") as f:
+        config = json.load(f)["mongodb"]
+
+    client = MongoClient(config["uri"])
+    db = client[config["db_name"]]
+    collection = db[config["collection_name"]]
+    state = state_collection(db, config)
+
+    print(f"国际通用时间: {current_utc_time}")
+    current = get_state(state, collection)
+    print(f"集合 {collection.name} 当前 schema_version: {current['schema_version']}（最新 {MIGRATIONS[-1].version}）")
+    if current.get("checkpoint"):
+        print(f"存在未完成的检查点: {current['checkpoint']}")
+    pending = pending_migrations(state, collection)
+    for migration in pending:
+        remaining = collection.count_documents(migration.filter)
+        print(f"  待执行 v{migration.version}: {migration.description}（当前匹配 {remaining} 条）")
+
+    if not args.status and pending:
+        migrate(collection, state, target=args.to, batch_size=args.batch_size, pause=args.pause)
@@ -1,12 +1,7 @@
-# 从POSCAR等文件转化为MongoDB数据库文档
-# 插入文档到 MongoDB
-from turtledemo.penrose import start
-
+# 查找 composition 重复的文档
+# 在服务端用一次 $group 聚合完成（allowDiskUse），客户端只接收重复组，不随集合规模增长
 from pymongo import MongoClient
-import pprint
-import os
-import shutil
-from collections import Counter
+import argparse
 import json
 
 
@@ -18,32 +13,108 @@ client = MongoClient(config["uri"])
 collection = client[config["db_name"]][config["collection_name"]]
 
 
+def supports_sort_array(collection):
+    """$sortArray 需要 MongoDB 5.2+"""
+    return collection.database.client.server_info()["versionArray"][:2] >= [5, 2]
+
+
+def _sorted_by_k(array_expr, sort_array=True):
+    """按元素符号 k 排序的 [{k, v}] 数组；不支持 $sortArray 时用 $reduce 做插入排序（元素种类很少）"""
+    if sort_array:
+        return {"$sortArray": {"input": array_expr, "sortBy": {"k": 1}}}
+    return {"$reduce": {
+        "input": array_expr,
+        "initialValue": [],
+        "in": {"$concatArrays": [
+            {"$filter": {"input": "$$value", "as": "x", "cond": {"$lt": ["$$x.k", "$$this.k"]}}},
+            ["$$this"],
+            {"$filter": {"input": "$$value", "as": "x", "cond": {"$gte": ["$$x.k", "$$this.k"]}}},
+        ]},
+    }}
+
+
+def composition_key_stage(reduced=False, sort_array=True):
+    """
+    构建规范化 composition 键的 $addFields 阶段列表
+
+    - composition → 去掉计数为 0 的元素后按元素符号排序的 [{k, v}] 数组，与字段顺序无关
+    - sort_array=True 时用 $sortArray（MongoDB 5.2+），否则用 $reduce 插入排序（3.6+ 可用）
+    - reduced=True 时先除以所有计数的最大公约数，使 B10Sr2 与 B5Sr1 归为一组
+      （公约数在服务端计算：从最小计数往下找第一个能整除所有计数的数；
+      计数不是正整数、找不到公约数时按 1 处理，即不约化，文档仍参与分组）
+    """
+    nonzero = {"$filter": {
+        "input": {"$objectToArray": "$composition"},
+        "as": "kv",
+        "cond": {"$ne": ["$$kv.v", 0]},
+    }}
+    sorted_kv = _sorted_by_k(nonzero, sort_array)
+    if not reduced:
+        return [{"$addFields": {"_comp_key": sorted_kv}}]
+
+    gcd = {
+        "$let": {
+            "vars": {"counts": "$_comp_kv.v"},
+            "in": {"$arrayElemAt": [{"$filter": {
+                # 计数全为 0 时 $min 为 null，按 0 处理（$range 为空，公约数取 1）
+                "input": {"$range": [{"$toInt": {"$ifNull": [{"$min": "$$counts"}, 0]}}, 0, -1]},
+                "as": "d",
+                "cond": {"$allElementsTrue": [{"$map": {
+                    "input": "$$counts",
+                    "as": "c",
+                    "in": {"$eq": [{"$mod": ["$$c", "$$d"]}, 0]},
+                }}]},
+            }}, 0]},
+        }
+    }
+    return [
+        {"$addFields": {"_comp_kv": sorted_kv}},
+        {"$addFields": {"_comp_gcd": {"$ifNull": [gcd, 1]}}},
+        {"$addFields": {"_comp_key": {"$map": {
+            "input": "$_comp_kv",
+            "as": "kv",
+            "in": {"k": "$$kv.k", "v": {"$divide": ["$$kv.v", "$_comp_gcd"]}},
+        }}}},
+    ]
+
+
+def find_duplicates(collection, reduced=False, sort_array=None):
+    """
+    返回游标，每项为 {"_id": 规范化 composition 键, "count": n, "entry_ids": [...]}
+
+    sort_array 为 None 时按服务器版本自动选择 $sortArray 或 $reduce 排序
+    """
+    if sort_array is None:
+        sort_array = supports_sort_array(collection)
+    pipeline = [
+        {"$match": {"composition": {"$type": "object"}}},
+        # 2. 只取需要的两个字段，减少处理的数据量
+        {"$project": {"_id": 0, "entry_id": 1, "composition": 1}},
+        *composition_key_stage(reduced, sort_array),
+        {"$group": {"_id": "$_comp_key", "count": {"$sum": 1}, "entry_ids": {"$push": "$entry_id"}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$sort": {"count": -1}},
+    ]
+    return collection.aggregate(pipeline, allowDiskUse=True)
+
 
+def format_key(key):
+    # [{"k": "B", "v": 5}, {"k": "Sr", "v": 1}] → "B5Sr1"（约化后的计数为 5.0 等浮点数时同样显示为 5）
+    return "".join(f"{kv['k']}{kv['v']:g}" for kv in key)
 
-# 2. 只取需要的两个字段，减少网络传输
-# 只取需要的字段
-docs = list(collection.find({}, {"_id": 0, "entry_id": 1, "composition": 1}))
 
-# 把 composition 变成可哈希的字符串
-def _hashable(comp):
-    if isinstance(comp, dict):
-        # 字典 → 按字母序排序后转成 json 字符串
-        return json.dumps(comp, sort_keys=True)
-    else:
-        # 字符串/元组直接返回
-        return str(comp)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="查找重复的 composition")
+    parser.add_argument("--reduced", action="store_true", help="按约化化学式分组（B10Sr2 与 B5Sr1 视为重复）")
+    args = parser.parse_args()
 
-# 统计
-comp_counter = Counter(_hashable(d["composition"]) for d in docs)
+    found = 0
+    for group in find_duplicates(collection, reduced=args.reduced):
+        if found == 0:
+            print("🔍 发现重复：")
+        found += 1
+        print(f"  {format_key(group['_id'])} → 出现 {group['count']} 次")
+        print(f"    entry_id: {group['entry_ids']}")
 
-duplicates = {comp: cnt for comp, cnt in comp_counter.items() if cnt > 1}
-if not duplicates:
-    print("✅ 无重复 composition。")
-else:
-    print("🔍 发现重复：")
-    for comp_str, cnt in duplicates.items():
-        # 反解成原始形式打印
-        original_comp = json.loads(comp_str) if comp_str.startswith("{") else comp_str
-        print(f"  {original_comp} → 出现 {cnt} 次")
-        entry_ids = [d["entry_id"] for d in docs if _hashable(d["composition"]) == comp_str]
-        print(f"    entry_id: {entry_ids}")
\ No newline at end of file
+    if not found:
+        print("✅ 无重复 composition。")
@@ -1,8 +1,10 @@
-
 from pymongo import MongoClient
 from pprint import pprint
+import argparse
 import json
 
+from structure_utils import chemsys_filter
+
 # 读取配置文件
 with open("config.json", "r") as f:
     config = json.load(f)["mongodb"]
@@ -14,13 +16,28 @@ collection = client[config["db_name"]][config["collection_name"]]
 b = "分割线，根据键值对================================================================"
 # result = collection.find({'composition.B': 2, 'composition.Sr': 1})
 #
-result = collection.find({
-    'composition.Sc': {'$exists': True},
-    'composition.Ti': {'$exists': True},
-    'composition.B': {'$exists': True}
-})
+# 按化学体系查询：使用入库时写入的 elements / chemsys 字段（有索引），不再对 composition 动态键做 $exists 全表扫描
+# 旧数据需先运行一次 012 --backfill 回填这些字段
+# - all    包含所有给定元素（Sc、Ti、B 都有，可含其它元素）
+# - exact  恰好是 B-Sc-Ti 体系
+# - subset 只由 Sc、Ti、B 中的元素组成（B、Sc-Ti、B-Sc-Ti 等）
+ELEMENTS = "Sc,Ti,B"
+MODE = "all"
+
+
+def find_chemsys(collection, elements, mode="all", projection=None):
+    return collection.find(chemsys_filter(elements, mode), projection).sort("entry_num", 1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="按化学体系查询")
+    parser.add_argument("elements", nargs="?", default=ELEMENTS, help="元素，逗号或 - 分隔，如 Sc,Ti,B")
+    parser.add_argument("--mode", choices=["all", "exact", "subset"], default=MODE, help="查询模式")
+    args = parser.parse_args()
 
-# 打印查询结果
-for doc in result:
-    pprint(doc)
+    elements = [el.strip() for el in args.elements.replace("-", ",").split(",") if el.strip()]
+    result = find_chemsys(collection, elements, args.mode)
 
+    # 打印查询结果
+    for doc in result:
+        pprint(doc)
@@ -1,41 +1,114 @@
-# 从POSCAR等文件转化为MongoDB数据库文档
-# 插入文档到 MongoDB
-from turtledemo.penrose import start
-import pandas as pd
-
+# 根据 entry_id 批量软删除
+# 1. --dry-run 只统计将被删除的数量
+# 2. 先用服务端 $merge 聚合把匹配文档整体移入归档集合（附带 _deleted_at 删除时间）
+# 3. 再按 _id 分块 delete_many 从主集合删除（只删除已确认归档的文档）
+# 4. --undo 从归档集合批量恢复
+# 5. 删除和恢复都会同步更新前端集合（frontend_view.py）
+# 6. 恢复的文档写入 modified_at，011 增量备份会重新导出
 from pymongo import MongoClient
-import pprint
-import os
-import shutil
-from collections import Counter
-import json
-from pprint import pprint
-import json
-import csv
-import json
+import argparse
 import json
+import re
 
-# 读取配置文件
-with open("config.json", "r") as f:
-    config = json.load(f)["mongodb"]
+from frontend_view import view_collection, refresh_view, remove_from_view
 
-client = MongoClient(config["uri"])
-collection = client[config["db_name"]][config["collection_name"]]
+# 每次 delete_many 最多删除的文档数
+DELETE_CHUNK_SIZE = 1000
 
 a = "分割线，快速删除值================================================================"
-ids_to_delete = ['ID-604', 'ID-606']
-
-# 3. 先查询要删除的文档（确认信息）
-query = {"entry_id": {"$in": ids_to_delete}}
-docs_to_delete = list(collection.find(query))
-
-if docs_to_delete:
-    print(f"即将删除以下 {len(docs_to_delete)} 条记录：")
-    for doc in docs_to_delete:
-        pprint(doc)
-        print("-" * 60)
-
-    delete_result = collection.delete_many(query)
-    print(f"\n成功删除 {delete_result.deleted_count} 条记录")
-else:
-    print(f"未找到ID为 {ids_to_delete} 的记录")
+IDS_TO_DELETE = "ID-604,ID-606"
+
+
+def parse_entry_ids(expr):
+    """解析 "ID-604,ID-606" 或 "604-610,700" 形式的表达式，返回 entry_id 列表"""
+    entry_ids = []
+    for token in re.split(r"[,\s]+", expr.strip()):
+        numbers = [int(n) for n in re.findall(r"\d+", token)]
+        if len(numbers) == 1:
+            entry_ids.append(f"ID-{numbers[0]}")
+        elif len(numbers) == 2:
+            start, end = sorted(numbers)
+            entry_ids.extend(f"ID-{n}" for n in range(start, end + 1))
+        elif token:
+            raise ValueError(f"无法解析的 ID 表达式: {token}")
+    return entry_ids
+
+
+def _delete_in_chunks(collection, ids, chunk_size=DELETE_CHUNK_SIZE):
+    deleted = 0
+    for i in range(0, len(ids), chunk_size):
+        deleted += collection.delete_many({"_id": {"$in": ids[i:i + chunk_size]}}).deleted_count
+    return deleted
+
+
+def _archived_ids(archive, query):
+    return [doc["_id"] for doc in archive.find(query, {"_id": 1})]
+
+
+def soft_delete(collection, archive, query, chunk_size=DELETE_CHUNK_SIZE, view=None):
+    """把匹配文档移入归档集合后从主集合删除，返回 (归档数, 删除数)"""
+    collection.aggregate([
+        {"$match": query},
+        {"$set": {"_deleted_at": "$$NOW"}},
+        {"$merge": {"into": archive.name, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ])
+    # 只删除归档集合中确实存在的文档，避免 $merge 之后新写入的匹配文档被误删
+    ids = _archived_ids(archive, query)
+    deleted = _delete_in_chunks(collection, ids, chunk_size)
+    if view is not None:
+        remove_from_view(view, ids)
+    return len(ids), deleted
+
+
+def undo_delete(collection, archive, query, chunk_size=DELETE_CHUNK_SIZE, view=None):
+    """从归档集合恢复匹配文档（主集合中已存在同 _id 的保持不变），返回 (恢复数, 清理的归档数)"""
+    archive.aggregate([
+        {"$match": query},
+        {"$unset": "_deleted_at"},
+        {"$set": {"modified_at": "$$NOW"}},
+        {"$merge": {"into": collection.name, "on": "_id", "whenMatched": "keepExisting", "whenNotMatched": "insert"}},
+    ])
+    ids = [doc["_id"] for doc in collection.find({"_id": {"$in": _archived_ids(archive, query)}}, {"_id": 1})]
+    if view is not None:
+        refresh_view(collection, view, {"_id": {"$in": ids}})
+    return len(ids), _delete_in_chunks(archive, ids, chunk_size)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="根据 entry_id 批量软删除（移入归档集合）")
+    parser.add_argument("ids", nargs="?", default=IDS_TO_DELETE, help='要删除的 ID，如 "ID-604,ID-606" 或 "604-610"')
+    parser.add_argument("--dry-run", action="store_true", help="只统计数量，不做任何修改")
+    parser.add_argument("--undo", action="store_true", help="从归档集合恢复这些 ID")
+    args = parser.parse_args()
+
+    # 读取配置文件
+    with open("config.json", "r") as f:
+        config = json.load(f)["mongodb"]
+
+    client = MongoClient(config["uri"])
+    db = client[config["db_name"]]
+    collection = db[config["collection_name"]]
+    archive = db[config.get("archive_collection", config["collection_name"] + "_archive")]
+    view = view_collection(db, config)
+
+    ids_to_delete = parse_entry_ids(args.ids)
+    query = {"entry_id": {"$in": ids_to_delete}}
+
+    if args.undo:
+        if args.dry_run:
+            print(f"归档集合中可恢复 {archive.count_documents(query)} 条记录")
+        else:
+            restored, cleaned = undo_delete(collection, archive, query, view=view)
+            print(f"✅ 已恢复 {restored} 条记录，并从归档集合 {archive.name} 中移除 {cleaned} 条")
+        raise SystemExit(0)
+
+    # 3. 先统计要删除的文档数量（确认信息）
+    total = collection.count_documents(query)
+    if total == 0:
+        print(f"未找到ID为 {ids_to_delete} 的记录")
+    elif args.dry_run:
+        print(f"[dry-run] 将删除 {total} 条记录（共请求 {len(ids_to_delete)} 个 ID），未做任何修改")
+    else:
+        archived, deleted = soft_delete(collection, archive, query, view=view)
+        print(f"已归档 {archived} 条记录到 {archive.name}")
+        print(f"\n成功删除 {deleted} 条记录（可用 --undo 恢复）")
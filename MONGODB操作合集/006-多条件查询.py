@@ -4,6 +4,8 @@
 📌 功能概述：
 本脚本从 MongoDB 数据库中查询符合特定结构和性质条件的材料数据，筛选出具有 `ThB5(P4/mmm)` 晶体结构、
 超导图像编号（img_number）为 0 的材料，并将结果按 entry_id 数值升序排列，最终导出为 CSV 文件。
+聚合游标只消费一次，每条结果按固定大小分块分发给各个输出（控制台 / CSV / JSONL / Parquet），
+不在内存中构建全部结果的列表或 DataFrame，匹配 10 万条以上时内存占用也保持平稳。
 
 🎯 查询条件：
 - original-structure 必须为 'ThB5(P4/mmm)'
@@ -16,17 +18,21 @@
   - 化学组成（Composition）
   - 超导相关性质（形成能、能量凸包、λ值、图像编号、low_three 等）
 
-💾 文件输出：
-- 所有查询结果自动整理为结构化表格（DataFrame）
-- 保存为：`03-1-superconductivity_data.csv`
-- 包含字段：Entry ID, Composition, Formation Energy, Energy Above Hull, Image Number, Lambda Gamma, Low Three
+💾 文件输出（通过 --outputs 选择，默认 console,csv）：
+- CSV：`03-1-superconductivity_data.csv`
+- JSONL：`03-1-superconductivity_data.jsonl`
+- Parquet：`03-1-superconductivity_data.parquet`（需安装 pyarrow；列定义与 015 导出相同，见 parquet_utils.py）
+- CSV / JSONL 包含字段：Entry ID, Composition, Formation Energy, Energy Above Hull, Image Number, Lambda Gamma, Low Three
+
+🚀 使用示例：
+    python 006-多条件查询.py --outputs console,csv,parquet
 
 
 📅 作者：张圳锐
 """
-import numpy as np
-import pandas as pd
 from pymongo import MongoClient
+import argparse
+import csv
 import json
 
 with open("config.json", "r") as f:
@@ -35,54 +41,89 @@ with open("config.json", "r") as f:
 client = MongoClient(config["uri"])
 collection = client[config["db_name"]][config["collection_name"]]
 
+OUTPUT_BASENAME = "03-1-superconductivity_data"
+CHUNK_SIZE = 1000
 
+COLUMNS = ["Entry ID", "Composition", "Formation Energy", "Energy Above Hull",
+           "Image Number", "Lambda Gamma", "Low Three"]
 
 
+# ========== 输出端：每个 sink 接收固定大小的文档块 ==========
+class ConsoleSink:
+    def write(self, docs):
+        for row in map(to_row, docs):
+            print(f"\nEntry ID: {row['Entry ID']}")
+            print(f"Composition: {row['Composition']}")
 
+            print("\nSuperconductivity Related Properties:")
+            print(f"Formation Energy: {row['Formation Energy']}")
+            print(f"Energy Above Hull: {row['Energy Above Hull']}")
+            print(f"Image Number: {row['Image Number']}")
+            print(f"Lambda Gamma: {row['Lambda Gamma']}")
+            print(f"Low Three: {row['Low Three']}")
 
-d = "查找满足 original-structure 为 'ThB5(P4/mmm)' 且 formation_energy 小于 0 和 img_number 为 0 的数据、且 ID 从小到大输出============="
-# 构建查询条件
-query = {
-    "original-structure": "ThB5(P4/mmm)",
-    "$and": [
-        # {"structure.Superconductivity_related_properties.formation_energy": {"$lt": 0}},
-        {"structure.Superconductivity_related_properties.img_number": 0}
-    ]
-}
+    def close(self):
+        pass
 
-pipeline = [
-    {"$match": query},
-    {"$addFields": {
-        # 提取 "ID-123" 中的数值部分（假设格式为 "ID-数字"）
-        "id_num": {
-            "$toInt": {"$substr": ["$entry_id", 3, -1]}  # 从第3字符截取到末尾
-        }
-    }},
-    {"$sort": {"id_num": 1}},  # 按数值升序排序
-    {"$project": {"id_num": 0}}  # 隐藏临时字段
-]
 
-results = collection.aggregate(pipeline)
-for doc in results:
-    print(f"\nEntry ID: {doc['entry_id']}")
-    print(f"Composition: {doc['composition']}")
+class CsvSink:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "w", encoding="utf-8", newline="")
+        self.writer = csv.DictWriter(self.file, fieldnames=COLUMNS)
+        self.writer.writeheader()
 
-    # 获取超导相关属性
-    sc_props = doc['structure']['Superconductivity_related_properties']
+    def write(self, docs):
+        self.writer.writerows(map(to_row, docs))
+
+    def close(self):
+        self.file.close()
+        print(f"数据已保存到 {self.path}")
+
+
+class JsonlSink:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "w", encoding="utf-8")
+
+    def write(self, docs):
+        self.file.writelines(json.dumps(to_row(doc), ensure_ascii=False) + "\n" for doc in docs)
+
+    def close(self):
+        self.file.close()
+        print(f"数据已保存到 {self.path}")
 
 
-    print("\nSuperconductivity Related Properties:")
-    print(f"Formation Energy: {sc_props['formation_energy']}")
-    print(f"Energy Above Hull: {sc_props['energy_above_hull']}")
-    print(f"Image Number: {sc_props['img_number']}")
-    print(f"Lambda Gamma: {sc_props['lambda_gamma']}")
-    print(f"Low Three: {sc_props['low_three']}")
+class ParquetSink:
+    def __init__(self, path):
+        # pyarrow 为可选依赖，只在选择 parquet 输出时导入；列定义与 015 共用 parquet_utils
+        import pyarrow.parquet as pq
+        from parquet_utils import build_schema, to_record_batch
+        self.to_record_batch = to_record_batch
+        self.path = path
+        self.schema = build_schema()
+        self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
 
-# 提取数据到列表
-data = []
-for doc in results:
+    def write(self, docs):
+        self.writer.write_batch(self.to_record_batch(docs, self.schema))
+
+    def close(self):
+        self.writer.close()
+        print(f"数据已保存到 {self.path}")
+
+
+SINKS = {
+    "console": lambda: ConsoleSink(),
+    "csv": lambda: CsvSink(f"{OUTPUT_BASENAME}.csv"),
+    "jsonl": lambda: JsonlSink(f"{OUTPUT_BASENAME}.jsonl"),
+    "parquet": lambda: ParquetSink(f"{OUTPUT_BASENAME}.parquet"),
+}
+
+
+def to_row(doc):
+    # 获取超导相关属性
     sc_props = doc['structure']['Superconductivity_related_properties']
-    data.append({
+    return {
         "Entry ID": doc['entry_id'],
         "Composition": doc['composition'],
         "Formation Energy": sc_props['formation_energy'],
@@ -90,11 +131,64 @@ for doc in results:
         "Image Number": sc_props['img_number'],
         "Lambda Gamma": sc_props['lambda_gamma'],
         "Low Three": sc_props['low_three']
-    })
+    }
+
+
+def stream_to_sinks(cursor, sinks, chunk_size=CHUNK_SIZE):
+    """只消费一次游标，按块把结果分发给所有输出端，返回总条数"""
+    total = 0
+    chunk = []
+    try:
+        for doc in cursor:
+            chunk.append(doc)
+            if len(chunk) >= chunk_size:
+                for sink in sinks:
+                    sink.write(chunk)
+                total += len(chunk)
+                chunk = []
+        if chunk:
+            for sink in sinks:
+                sink.write(chunk)
+            total += len(chunk)
+    finally:
+        for sink in sinks:
+            sink.close()
+    return total
 
-# 创建 DataFrame 并保存为 CSV
-df = pd.DataFrame(data)
-df.to_csv("03-1-superconductivity_data.csv", index=False)  # 不保存行索引
 
-print("数据已保存到 03-superconductivity_data.csv")
+d = "查找满足 original-structure 为 'ThB5(P4/mmm)' 且 formation_energy 小于 0 和 img_number 为 0 的数据、且 ID 从小到大输出============="
+# 构建查询条件
+query = {
+    "original-structure": "ThB5(P4/mmm)",
+    "$and": [
+        # {"structure.Superconductivity_related_properties.formation_energy": {"$lt": 0}},
+        {"structure.Superconductivity_related_properties.img_number": 0}
+    ]
+}
+
+pipeline = [
+    {"$match": query},
+    # entry_num 为入库时写入的 entry_id 数值部分（旧数据用 012 --backfill 回填），排序可直接走索引
+    {"$sort": {"entry_num": 1}},  # 按数值升序排序
+    # 只保留输出需要的字段，不传输 sites 等大字段
+    {"$project": {
+        "_id": 0,
+        "entry_id": 1,
+        "entry_num": 1,
+        "original-structure": 1,
+        "composition": 1,
+        "structure.Superconductivity_related_properties": 1,
+    }},
+]
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MongoDB 材料数据查询与导出工具")
+    parser.add_argument("--outputs", default="console,csv",
+                        help=f"输出端，逗号分隔，可选 {','.join(SINKS)}")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="每次分发给输出端的行数")
+    args = parser.parse_args()
+
+    sinks = [SINKS[name.strip()]() for name in args.outputs.split(",") if name.strip()]
+    results = collection.aggregate(pipeline)
+    total = stream_to_sinks(results, sinks, args.chunk_size)
+    print(f"共导出 {total} 条记录")
@@ -1,54 +1,50 @@
+# 前端 JSON 数据
+# 页面数据来自预先构建的前端集合（见 frontend_view.py），只包含 name / role / lambda_gamma 等少量字段，
+# 页面加载只做一次带索引的读取，不再每次从原始文档（含 sites 大数组）现场转换。
+# - 012 入库、005 删除/恢复时会增量更新前端集合
+# - 首次使用或修改了 transform_document 后运行：python 007-mongodb转前端json.py --rebuild
+#   （重建时入库可继续运行：结束前会补写重建期间变化 / 删除的文档）
+# - --oss-config 指定 oss_config.json 时，图片 / omega.dat 附带批量签名的 URL（--offline 为本地离线签名）
 from pymongo import MongoClient
+import argparse
 import pprint
 import os
+import sys
 import json
 
+from frontend_view import view_collection, ensure_view_indexes, rebuild_view, get_page
+
 # 读取配置文件
 with open("config.json", "r") as f:
     config = json.load(f)["mongodb"]
 
 client = MongoClient(config["uri"])
-collection = client[config["db_name"]][config["collection_name"]]
-
-
-def transform_document(document):
-    doc_id = document.get("_id", "")
-
-    composition = document.get("composition", {})
-    # 修改这一行来处理当数量为1时不显示数字的情况
-    name = "".join(f"{key}{value}" if value != 1 else f"{key}" for key, value in composition.items())
-    role = name
-
-    elements = list(composition.keys())
-    if len(elements) == 3:
-        if elements[1] == "B":
-            # 处理 B 元素的情况
-            elements = [elements[0], elements[2], elements[1]]
-            role = "".join(
-                f"{key}{composition[key]}" if composition[key] != 1 else key
-                for key in elements
-            ).replace(elements[0], "M", 1).replace(elements[1], "N", 1)
-
-        else:
-            role = name.replace(elements[0], "M", 1).replace(elements[1], "N", 1)
-
-    elif len(elements) == 2:
-        # Only one element exists, replace it with M
-        role = name.replace(elements[0], "M", 1)
-
-    image_path = "https://img.abclonal.com.cn/abclonal/Catalog/A11351/A11351_2.jpg?t=1691482739"
-
-    lambda_gamma = document.get("Superconductivity_related_properties", {}).get("lambda_gamma", None)
-    energy_relative_to_convex_hull = document.get("Superconductivity_related_properties", {}).get(
-        "Energy_relative_to_convex_hull", None)
-    posfile = document.get("Superconductivity_related_properties", {}).get("posfile", None)
-
-    return {
-        "id": doc_id,
-        "name": name,
-        "role": role,
-        "image": image_path,
-        "lambda_gamma": lambda_gamma,
-        "energy_relative_to_convex_hull": energy_relative_to_convex_hull,
-        "posfile": posfile
-    }
+db = client[config["db_name"]]
+collection = db[config["collection_name"]]
+view = view_collection(db, config)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="前端集合的重建与预览")
+    parser.add_argument("--rebuild", action="store_true", help="从原始集合全量重建前端集合")
+    parser.add_argument("--skip", type=int, default=0, help="预览的起始位置")
+    parser.add_argument("--limit", type=int, default=20, help="预览的条数")
+    parser.add_argument("--oss-config", default=None, help="oss_config.json 路径，指定后为附件生成签名 URL")
+    parser.add_argument("--offline", action="store_true", help="使用本地 FakeBucket 离线签名")
+    args = parser.parse_args()
+
+    signer = None
+    if args.oss_config:
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "阿里云操作合集"))
+        from oss_utils import make_signer
+        with open(args.oss_config, "r") as f:
+            signer = make_signer(json.load(f)["oss"], offline=args.offline)
+
+    if args.rebuild:
+        total = rebuild_view(collection, view)
+        print(f"✅ 前端集合 {view.name} 已重建，共 {total} 条")
+    else:
+        ensure_view_indexes(view)
+
+    for item in get_page(view, args.skip, args.limit, signer=signer):
+        pprint.pprint(item)
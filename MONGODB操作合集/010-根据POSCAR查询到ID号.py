@@ -1,70 +1,216 @@
 from pymongo import MongoClient
+from itertools import permutations
 import numpy as np
+import argparse
 import json
+import os
+
+from poscar_utils import parse_poscar, find_poscar_files, parse_many
+
+# 默认容差：晶格矩阵元素（Å）与分数坐标
+LATTICE_TOL = 1e-4
+COORD_TOL = 1e-4
+
+# 元素种类不超过该值时，用 composition 各种键顺序的排列做精确匹配（可走 composition 索引）
+MAX_PERMUTED_ELEMENTS = 5
+
+# 目录模式下每次候选查询 $or 中包含的 composition 数
+OR_BATCH_SIZE = 100
+
+# 计算坐标距离时每块的最大元素数（行数 × 对方原子数），大晶胞分块计算，避免 (n, n, 3) 的中间数组
+DISTANCE_CHUNK_ELEMENTS = 1_000_000
+
+# 只取比对所需字段，避免传输其它大字段
+CANDIDATE_PROJECTION = {
+    "entry_id": 1,
+    "composition": 1,
+    "structure.lattice.matrix": 1,
+    "structure.sites.label": 1,
+    "structure.sites.abc": 1,
+    "structure.Superconductivity_related_properties": 1,
+}
+
+
+def composition_key(composition):
+    """与键顺序无关的 composition 表示，用于分组"""
+    return tuple(sorted((el, int(n)) for el, n in composition.items()))
+
+
+def composition_filter(composition):
+    """
+    构建 composition 候选筛选条件
+
+    数据库中 composition 是嵌入文档，整体相等比较与键顺序有关，
+    因此元素较少时列出所有键顺序做 $in（可走 composition 索引）；
+    元素过多时退化为逐元素匹配。
+    """
+    items = list(composition.items())
+    if len(items) <= MAX_PERMUTED_ELEMENTS:
+        return {"composition": {"$in": [dict(p) for p in permutations(items)]}}
+    return {f"composition.{el}": n for el, n in items}
+
+
+def _site_arrays(sites):
+    labels = np.array([site['label'] for site in sites])
+    frac = np.array([site['abc'][:3] for site in sites], dtype=float).reshape(-1, 3)
+    return labels, frac
+
+
+def lattice_matches(matrix_a, matrix_b, tol=LATTICE_TOL):
+    return np.allclose(np.asarray(matrix_a, dtype=float), np.asarray(matrix_b, dtype=float), atol=tol, rtol=0)
+
+
+def _close_matrix(a, b, tol):
+    """(len(a), len(b)) 布尔矩阵：两组分数坐标在周期性折回后各分量之差都不超过 tol"""
+    close = np.empty((len(a), len(b)), dtype=bool)
+    chunk = max(1, DISTANCE_CHUNK_ELEMENTS // max(len(b), 1))
+    for start in range(0, len(a), chunk):
+        diff = a[start:start + chunk, None, :] - b[None, :, :]
+        diff -= np.round(diff)  # 周期性折回到 [-0.5, 0.5]
+        close[start:start + chunk] = np.abs(diff).max(axis=-1) <= tol
+    return close
+
+
+def _perfect_matching(close):
+    """
+    判断 (n, n) 布尔矩阵描述的二分图是否存在完美匹配（每个原子恰好对应对方一个原子）
+
+    常见情况下每行、每列都只有一个 True，直接判定；否则用增广路（Kuhn 算法，BFS）求最大匹配。
+    """
+    if not (close.any(axis=1).all() and close.any(axis=0).all()):
+        return False
+    if (close.sum(axis=1) == 1).all() and (close.sum(axis=0) == 1).all():
+        return True
+
+    n = len(close)
+    adj = [np.flatnonzero(row) for row in close]
+    match_a = [-1] * n  # a -> b
+    match_b = [-1] * n  # b -> a
+    for i in range(n):
+        prev = {}  # b -> 经由的 a
+        frontier, found = [i], -1
+        while frontier and found < 0:
+            next_frontier = []
+            for a in frontier:
+                for b in adj[a]:
+                    if b in prev:
+                        continue
+                    prev[b] = a
+                    if match_b[b] < 0:
+                        found = b
+                        break
+                    next_frontier.append(match_b[b])
+                if found >= 0:
+                    break
+            frontier = next_frontier
+        if found < 0:
+            return False
+        # 沿增广路翻转匹配
+        b = found
+        while True:
+            a = prev[b]
+            b_old = match_a[a]
+            match_a[a], match_b[b] = b, a
+            if a == i:
+                break
+            b = b_old
+    return True
+
+
+def sites_match(labels_a, frac_a, labels_b, frac_b, tol=COORD_TOL):
+    """
+    比较两组原子位点（与原子顺序无关，分数坐标按周期性折回，-0.0 与 1.0 视为相同）
+
+    参数为元素符号数组 (n,) 与分数坐标数组 (n, 3)。对每种元素计算两组坐标在容差内是否相近，
+    要求存在一一对应（完美匹配），不允许两个原子对应到对方同一个原子。
+    """
+    if len(labels_a) != len(labels_b):
+        return False
+
+    for label in np.unique(labels_a):
+        a = frac_a[labels_a == label]
+        b = frac_b[labels_b == label]
+        if len(a) != len(b):
+            return False
+        if not _perfect_matching(_close_matrix(a, b, tol)):
+            return False
+    return True
+
+
+def structure_matches(poscar, doc, lattice_tol=LATTICE_TOL, coord_tol=COORD_TOL):
+    """poscar 为 poscar_utils.Poscar；POSCAR 一侧直接使用解析得到的数组，不构建 sites 字典"""
+    structure = doc.get('structure', {})
+    matrix = structure.get('lattice', {}).get('matrix')
+    if matrix is None or not lattice_matches(poscar.lattice, matrix, lattice_tol):
+        return False
+    labels, frac = _site_arrays(structure.get('sites', []))
+    return sites_match(poscar.labels, poscar.frac_coords, labels, frac, coord_tol)
+
+
+def find_matches_batch(collection, poscar_list, lattice_tol=LATTICE_TOL, coord_tol=COORD_TOL):
+    """
+    批量查找匹配结构：所有 POSCAR 的候选文档按 composition 筛选分批（每批 OR_BATCH_SIZE 种）取回，
+    再在本地用 NumPy 比较晶格与坐标
+
+    返回:
+        与 poscar_list 等长的列表，每项为匹配到的文档列表
+    """
+    wanted = {}
+    for poscar in poscar_list:
+        wanted.setdefault(composition_key(poscar.composition), poscar.composition)
+    if not wanted:
+        return []
+
+    candidates = {key: [] for key in wanted}
+    compositions = list(wanted.values())
+    # 分批查询，避免目录模式下单个 $or 过大
+    for start in range(0, len(compositions), OR_BATCH_SIZE):
+        query = {"$or": [composition_filter(comp) for comp in compositions[start:start + OR_BATCH_SIZE]]}
+        for doc in collection.find(query, CANDIDATE_PROJECTION):
+            key = composition_key(doc.get('composition', {}))
+            if key in candidates:
+                candidates[key].append(doc)
+
+    return [
+        [doc for doc in candidates[composition_key(poscar.composition)]
+         if structure_matches(poscar, doc, lattice_tol, coord_tol)]
+        for poscar in poscar_list
+    ]
+
+
+def find_matches(collection, poscar, lattice_tol=LATTICE_TOL, coord_tol=COORD_TOL):
+    return find_matches_batch(collection, [poscar], lattice_tol, coord_tol)[0]
+
+
+def resolve_directory(collection, dir_path, lattice_tol=LATTICE_TOL, coord_tol=COORD_TOL, workers=None):
+    """
+    在进程池中解析目录下所有 POSCAR/CONTCAR/*.vasp 文件并批量查询对应的 entry_id
+
+    返回:
+        {文件路径: [entry_id, ...]}
+    """
+    parsed_paths, poscar_list = [], []
+    for path, poscar, error in parse_many(find_poscar_files(dir_path), workers):
+        if error:
+            print(f"⚠️ 解析失败，跳过: {path} ({error})")
+            continue
+        poscar_list.append(poscar)
+        parsed_paths.append(path)
+
+    matches = find_matches_batch(collection, poscar_list, lattice_tol, coord_tol)
+    return {path: [doc.get('entry_id') for doc in docs] for path, docs in zip(parsed_paths, matches)}
 
 
-def parse_poscar(poscar_path):
-    with open(poscar_path, 'r') as f:
-        lines = [line.strip() for line in f.readlines() if line.strip()]
-
-    # 解析元素和数量
-    elements = lines[5].split()
-    counts = list(map(int, lines[6].split()))
-    composition = dict(zip(elements, counts))
-
-    # 解析晶格常数
-    lattice = []
-    for line in lines[2:5]:
-        lattice.append([float(x) for x in line.split()[:3]])
-
-    # 解析原子位置
-    sites = []
-    for i, line in enumerate(lines[8:8+sum(counts)]):
-        parts = line.split()
-        abc = list(map(float, parts[:3]))
-        label = elements[np.searchsorted(np.cumsum(counts), i+1)]
-        sites.append({
-            'abc': abc,
-            'label': label,
-            'species': [{'element': label, 'occu': 1}]
-        })
-
-    return {
-        'composition': composition,
-        'lattice': {'matrix': lattice},
-        'sites': sites
-    }
-
-def build_query(poscar_data):
-    # 构建composition查询
-    composition_query = {'composition': poscar_data['composition']}
-
-    # 构建lattice查询 - 精确匹配晶格矩阵
-    lattice_query = {
-        'structure.lattice.matrix': poscar_data['lattice']['matrix']
-    }
-
-    # 构建sites查询 - 匹配关键原子位置（允许微小浮点差异）
-    sites_query = {
-        '$and': [
-            {'structure.sites': {
-                '$elemMatch': {
-                    'label': site['label'],
-                    '$and': [
-                        {'abc.0': {'$gte': site['abc'][0] - 1e-6, '$lte': site['abc'][0] + 1e-6}},
-                        {'abc.1': {'$gte': site['abc'][1] - 1e-6, '$lte': site['abc'][1] + 1e-6}},
-                        {'abc.2': {'$gte': site['abc'][2] - 1e-6, '$lte': site['abc'][2] + 1e-6}}
-                    ]
-                }
-            }}
-            for site in poscar_data['sites'][:]
-        ]
-    }
-
-    return {**composition_query, **lattice_query, **sites_query}
-
 # 使用示例
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="根据 POSCAR 查询数据库中的 entry_id")
+    parser.add_argument("paths", nargs="*", default=["010-POSCAR"],
+                        help="POSCAR 文件或目录；目录会递归查找 POSCAR/CONTCAR/*.vasp 并批量查询")
+    parser.add_argument("--lattice-tol", type=float, default=LATTICE_TOL, help="晶格矩阵元素容差（Å）")
+    parser.add_argument("--coord-tol", type=float, default=COORD_TOL, help="分数坐标容差")
+    parser.add_argument("--workers", type=int, default=None, help="目录模式下解析文件的进程数")
+    args = parser.parse_args()
+
     # 连接到 MongoDB
 
     # 读取配置文件
@@ -72,30 +218,34 @@ if __name__ == "__main__":
         config = json.load(f)["mongodb"]
 
     client = MongoClient(config["uri"])
+    # composition 索引由 012 的 ensure_indexes 创建（入库 / --backfill 时），查询时不再重复创建
     collection = client[config["db_name"]][config["collection_name"]]
 
-    # 解析POSCAR文件
-    poscar_data = parse_poscar('010-POSCAR')  # 替换为你的POSCAR文件路径
-
-    # 构建查询
-    query = build_query(poscar_data)
-
     # 执行查询
     try:
-        results = collection.find(query)
-
-        # 输出结果
-        count = 0
-        for doc in results:
-            count += 1
-            print(f"Found match ({count}): {doc.get('entry_id', 'N/A')}")
-            props = doc.get('structure', {}).get('Superconductivity_related_properties', {})
-            print(f"Formation energy: {props.get('formation_energy', 'N/A')}")
-            print(f"Energy above hull: {props.get('energy_above_hull', 'N/A')}")
-            print("-" * 50)
-
-        if count == 0:
-            print("No matching structures found.")
+        for path in args.paths:
+            if os.path.isdir(path):
+                # 批量模式：整个目录一次查询
+                for file_path, entry_ids in resolve_directory(collection, path, args.lattice_tol,
+                                                              args.coord_tol, args.workers).items():
+                    print(f"{file_path}: {', '.join(entry_ids) if entry_ids else 'No match'}")
+                continue
+
+            # 解析POSCAR文件
+            poscar = parse_poscar(path)  # 替换为你的POSCAR文件路径
+
+            # 输出结果
+            count = 0
+            for doc in find_matches(collection, poscar, args.lattice_tol, args.coord_tol):
+                count += 1
+                print(f"Found match ({count}): {doc.get('entry_id', 'N/A')}")
+                props = doc.get('structure', {}).get('Superconductivity_related_properties', {})
+                print(f"Formation energy: {props.get('formation_energy', 'N/A')}")
+                print(f"Energy above hull: {props.get('energy_above_hull', 'N/A')}")
+                print("-" * 50)
+
+            if count == 0:
+                print("No matching structures found.")
 
     except Exception as e:
-        print(f"An error occurred: {str(e)}")
\ No newline at end of file
+        print(f"An error occurred: {str(e)}")
@@ -1,76 +1,250 @@
 # export_mongo.py
+"""
+流式导出 MongoDB 集合为压缩 JSONL（每行一个 Extended JSON 文档）
+
+- 游标按批次迭代，逐行编码、逐行写入压缩流，内存占用与集合大小无关
+- 编码结果与 bson.json_util（Relaxed Extended JSON）兼容，可直接用 mongoimport 或 json_util.loads 还原
+- 安装了 orjson 时使用 orjson 编码，否则回退到 json_util；orjson 会把 NaN / Infinity 写成 null，
+  含非有限浮点数的文档改用 json_util 编码（{"$numberDouble": "NaN"}），恢复后数值不变
+- 支持 gzip / zstd（需安装 zstandard）/ 不压缩，可按未压缩大小切分为固定大小的分片
+- 支持增量备份：只导出 modified_at / datatime（BSON 日期）或 _id 时间戳晚于上次检查点的文档；
+  schema 迁移、012 回填与 005 撤销删除不改 datatime，但会写入 modified_at，因此同样会被增量导出；
+  全量与增量文件记录在 {prefix}-manifest.json 的备份链中，用 014-数据库恢复.py 按顺序回放
+  （注意：增量备份无法记录删除操作，删除较多时请重新做一次全量备份）
+
+用法：
+    python 011-数据库备份.py                     # 全量备份，开始新的备份链
+    python 011-数据库备份.py --incremental       # 增量备份（没有备份链时自动做全量）
+    python 011-数据库备份.py --compression zstd --shard-size-mb 512
+"""
 from pymongo import MongoClient
+from bson import json_util
+from bson.objectid import ObjectId
+from bson.json_util import RELAXED_JSON_OPTIONS
+from datetime import datetime, timezone
+import argparse
+import gzip
 import json
+import math
 import os
-from datetime import datetime
-import json
-import pandas as pd
 
-# 读取配置文件
-with open("config.json", "r") as f:
-    config = json.load(f)["mongodb"]
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-client = MongoClient(config["uri"])
-collection = client[config["db_name"]][config["collection_name"]]
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
+OUTPUT_DIR = './export'
+OUTPUT_PREFIX = 'a'
+BATCH_SIZE = 1000
 
-OUTPUT_DIR = ''
-OUTPUT_JSON = './export/a.json'
-OUTPUT_JSONL = './export/a.jsonl'  # 可选：逐行 JSON
-OUTPUT_CSV = './export/a.csv'     # 可选：CSV（需结构规整）
 
-# 创建输出目录
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+# ========== 编码：ObjectId / datetime 等转为 Extended JSON ==========
+def _bson_default(obj):
+    if isinstance(obj, ObjectId):
+        return {"$oid": str(obj)}
+    if isinstance(obj, datetime):
+        if obj.tzinfo is not None:
+            obj = obj.astimezone(timezone.utc).replace(tzinfo=None)
+        millis = obj.microsecond // 1000
+        text = obj.strftime("%Y-%m-%dT%H:%M:%S") + (f".{millis:03d}" if millis else "") + "Z"
+        return {"$date": text}
+    # 其它 BSON 类型（Decimal128、Binary 等）交给 json_util 处理
+    return json_util.default(obj, json_options=RELAXED_JSON_OPTIONS)
 
 
+def _has_nonfinite(value):
+    """文档中是否含有 NaN / Infinity"""
+    if isinstance(value, float):
+        return not math.isfinite(value)
+    if isinstance(value, dict):
+        return any(_has_nonfinite(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return any(_has_nonfinite(v) for v in value)
+    return False
 
-# ========== 读取所有文档 ==========
-print("正在从 MongoDB 读取数据...")
-documents = list(collection.find({}))  # 获取所有文档
-print(f"共读取到 {len(documents)} 条文档。")
-for doc in documents:
-    doc['_id'] = str(doc['_id'])
 
-# ========== 转换 ObjectId 和 datetime 为 JSON 可序列化格式 ==========
-def serialize_doc(doc):
-    """递归处理 ObjectId 和 datetime"""
-    if isinstance(doc, dict):
-        return {k: serialize_doc(v) for k, v in doc.items()}
-    elif isinstance(doc, list):
-        return [serialize_doc(i) for i in doc]
-    elif isinstance(doc, datetime):
-        return doc.isoformat() + 'Z'  # 标准 ISO 格式
-    elif hasattr(doc, '_id'):
-        doc['_id'] = str(doc['_id'])  # ObjectId 转字符串
-        return doc
-    else:
-        return doc
+def encode_doc(doc):
+    """把一个文档编码为一行 JSON（bytes，不含换行）"""
+    if orjson is not None:
+        line = orjson.dumps(doc, default=_bson_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        # orjson 把非有限浮点数写成 null：只有输出中出现 null 时才检查原文档，含 NaN / Infinity 的改用 json_util
+        if b"null" not in line or not _has_nonfinite(doc):
+            return line
+    return json_util.dumps(doc, json_options=RELAXED_JSON_OPTIONS, ensure_ascii=False).encode("utf-8")
 
-# 序列化所有文档
-serialized_docs = serialize_doc(documents)
 
-# ========== 写入 JSON 文件 ==========
-print(f"正在写入 JSON 文件: {OUTPUT_JSON}")
-with open(OUTPUT_JSON, 'w', encoding='utf-8') as f:
-    json.dump(serialized_docs, f, ensure_ascii=False, indent=2)
+# ========== 分片写入 ==========
+class ShardedJsonlWriter:
+    """
+    按行写入压缩 JSONL，未压缩字节数超过 shard_size 时切换到下一个分片
 
-print(f"✅ 成功导出到 {OUTPUT_JSON}")
+    参数:
+        output_dir: 输出目录
+        prefix: 文件名前缀，分片命名为 {prefix}-00000.jsonl.gz
+        compression: 'gzip' / 'zstd' / 'none'
+        shard_size: 每个分片的未压缩字节上限，0 表示不切分
+    """
 
-# ========== 可选：写入 JSONL（每行一个 JSON 对象）==========
-print(f"正在写入 JSONL 文件: {OUTPUT_JSONL}")
-with open(OUTPUT_JSONL, 'w', encoding='utf-8') as f:
-    for doc in serialized_docs:
-        f.write(json.dumps(doc, ensure_ascii=False) + '\n')
-print(f"✅ 成功导出到 {OUTPUT_JSONL}")
+    SUFFIXES = {"gzip": ".jsonl.gz", "zstd": ".jsonl.zst", "none": ".jsonl"}
 
-# ========== 可选：写入 CSV（仅当数据结构规整时）==========
-try:
-    df = pd.json_normalize(serialized_docs)  # 展平嵌套结构
-    df.to_csv(OUTPUT_CSV, index=False, encoding='utf-8-sig')
-    print(f"✅ 成功导出到 {OUTPUT_CSV}")
-except Exception as e:
-    print(f"❌ 导出 CSV 失败（可能结构不规整）: {e}")
-
-# ========== 关闭连接 ==========
-client.close()
-print("导出完成。")
\ No newline at end of file
+    def __init__(self, output_dir, prefix, compression="gzip", shard_size=0):
+        if compression == "zstd" and zstandard is None:
+            raise RuntimeError("使用 zstd 压缩需要先安装 zstandard：pip install zstandard")
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.compression = compression
+        self.shard_size = shard_size
+        self.files = []
+        self._raw = None
+        self._stream = None
+        self._written = 0
+
+    def _open_next(self):
+        self.close()
+        path = os.path.join(self.output_dir, f"{self.prefix}-{len(self.files):05d}{self.SUFFIXES[self.compression]}")
+        if self.compression == "gzip":
+            self._stream = gzip.open(path, "wb", compresslevel=6)
+        elif self.compression == "zstd":
+            self._raw = open(path, "wb")
+            self._stream = zstandard.ZstdCompressor(level=3).stream_writer(self._raw)
+        else:
+            self._stream = open(path, "wb")
+        self._written = 0
+        self.files.append(path)
+
+    def write(self, line):
+        if self._stream is None or (self.shard_size and self._written >= self.shard_size):
+            self._open_next()
+        self._stream.write(line)
+        self._stream.write(b"\n")
+        self._written += len(line) + 1
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+        if self._raw is not None:
+            self._raw.close()
+            self._raw = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ========== 备份链清单 ==========
+def manifest_path(output_dir, prefix):
+    return os.path.join(output_dir, f"{prefix}-manifest.json")
+
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json_util.loads(f.read())
+
+
+def save_manifest(path, manifest):
+    # 先写临时文件再替换，避免中断时清单损坏
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(json_util.dumps(manifest, json_options=RELAXED_JSON_OPTIONS, ensure_ascii=False, indent=2))
+    os.replace(tmp_path, path)
+
+
+def delta_query(since):
+    """修改时间（modified_at / datatime）或创建时间（_id 时间戳）不早于检查点的文档"""
+    return {"$or": [
+        {"modified_at": {"$gte": since}},
+        {"datatime": {"$gte": since}},
+        {"_id": {"$gte": ObjectId.from_datetime(since)}},
+    ]}
+
+
+def export_collection(collection, writer, query=None, batch_size=BATCH_SIZE):
+    """按 _id 顺序流式导出，返回导出的文档数"""
+    count = 0
+    cursor = collection.find(query or {}, batch_size=batch_size).sort("_id", 1)
+    for doc in cursor:
+        writer.write(encode_doc(doc))
+        count += 1
+        if count % (batch_size * 10) == 0:
+            print(f"已导出 {count} 条文档...")
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="流式导出 MongoDB 集合为压缩 JSONL")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR, help="输出目录")
+    parser.add_argument("--prefix", default=OUTPUT_PREFIX, help="输出文件名前缀")
+    parser.add_argument("--compression", choices=["gzip", "zstd", "none"], default="gzip", help="压缩格式")
+    parser.add_argument("--shard-size-mb", type=int, default=0, help="每个分片的未压缩大小（MB），0 表示不切分")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="游标每批读取的文档数")
+    parser.add_argument("--incremental", action="store_true",
+                        help="只导出上次备份之后新增或修改的文档，并追加到备份链")
+    args = parser.parse_args()
+
+    # 读取配置文件
+    with open("config.json", "r") as f:
+        config = json.load(f)["mongodb"]
+
+    client = MongoClient(config["uri"])
+    collection = client[config["db_name"]][config["collection_name"]]
+
+    # 创建输出目录
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    chain_path = manifest_path(args.output_dir, args.prefix)
+    manifest = load_manifest(chain_path)
+    incremental = args.incremental and manifest is not None and manifest.get("chain")
+    if args.incremental and not incremental:
+        print("⚠️ 未找到备份链清单，本次执行全量备份")
+
+    # 检查点取导出开始的时间：导出过程中被修改的文档会在下一次增量中再次导出（恢复时按 _id 覆盖，不会重复）
+    checkpoint = datetime.now(timezone.utc)
+    stamp = checkpoint.strftime("%Y%m%dT%H%M%SZ")
+    if incremental:
+        since = manifest["chain"][-1]["checkpoint"]
+        query = delta_query(since)
+        kind = "delta"
+        print(f"正在增量导出 {since} 之后变化的文档...")
+    else:
+        since = None
+        query = {}
+        kind = "full"
+        manifest = {"collection": config["collection_name"], "chain": []}
+        print("正在从 MongoDB 流式导出数据...")
+
+    with ShardedJsonlWriter(args.output_dir, f"{args.prefix}-{kind}-{stamp}", args.compression,
+                            args.shard_size_mb * 1024 * 1024) as writer:
+        total = export_collection(collection, writer, query, batch_size=args.batch_size)
+
+    # 记录索引定义，恢复时在数据加载完成后重建
+    manifest["indexes"] = [
+        {"name": name, **info} for name, info in collection.index_information().items() if name != "_id_"
+    ]
+    manifest["chain"].append({
+        "type": kind,
+        "since": since,
+        "checkpoint": checkpoint,
+        "compression": args.compression,
+        "files": [os.path.basename(path) for path in writer.files],
+        "count": total,
+    })
+    save_manifest(chain_path, manifest)
+
+    print(f"✅ 共导出 {total} 条文档（{kind}），写入 {len(writer.files)} 个文件：")
+    for path in writer.files:
+        print(f"  {path}")
+    print(f"备份链清单: {chain_path}（共 {len(manifest['chain'])} 个环节）")
+
+    # ========== 关闭连接 ==========
+    client.close()
+    print("导出完成。")
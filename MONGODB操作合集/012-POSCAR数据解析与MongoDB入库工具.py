@@ -10,10 +10,11 @@
 1. ✅ 自动解析文件路径中的化学式（支持复杂命名规则）
 2. ✅ 读取 POSCAR/CONTCAR 文件，构建标准晶体结构数据（lattice + sites）
 3. ✅ 关联外部属性数据（来自 '合并后的数据.txt'，支持多列格式）
-4. ✅ 智能生成唯一 entry_id（如 ID-1, ID-2...），支持断点续传
-5. ✅ 基于结构内容（lattice 和 sites）判断是否已存在，实现 upsert（存在则更新，否则插入）
-6. ✅ 自动创建以 entry_id 命名的文件夹，归档结构文件与相关图表（gamma-figsum.png, omega.dat）
-7. ✅ 支持从 config.json 读取数据库配置，避免硬编码，提升安全性与可移植性
+4. ✅ 智能生成唯一 entry_id（如 ID-1, ID-2...），基于计数器集合原子分配，支持断点续传与并发入库
+5. ✅ 基于规范化结构指纹（structure_hash，唯一索引）判断是否已存在，实现 upsert（存在则更新，否则插入）
+6. ✅ 写入后同步刷新前端集合（frontend_view.py），网站页面无需读取原始文档
+7. ✅ 自动创建以 entry_id 命名的文件夹（附件存入内容寻址 store 后以硬链接放入，相同内容只保存一份），归档结构文件与相关图表（gamma-figsum.png, omega.dat）
+8. ✅ 支持从 config.json 读取数据库配置，避免硬编码，提升安全性与可移植性
 
 📁 输入要求：
 - POSCAR/CONTCAR 文件路径结构示例：
@@ -42,26 +43,48 @@
 1. 修改 folder_paths 为你的实际数据目录
 2. 确保 '合并后的数据.txt' 文件存在且格式正确
 3. 首次运行建议先备份数据库
-4. 可通过注释 start_count 相关逻辑强制从 ID-1 开始
+4. entry_id 由 counters 集合中的原子计数器分配，多个入库任务并发运行也不会重号；
+   删除 counters 集合中 _id 为 "entry_id" 的计数器文档后，下次运行会按现有最大编号重新初始化
+5. 远程数据库建议使用批量模式，减少网络往返：
+       python 012-POSCAR数据解析与MongoDB入库工具.py --batch-size 500
+6. CONTCAR 解析在进程池中并行完成，可用 --workers 指定进程数
+7. 重复运行时会根据本地清单 012-ingest_manifest.sqlite 跳过 CONTCAR、附件（gamma-figsum.png / omega.dat）
+   与属性行都未变化的目录（附件归档失败的目录不会被视为未变化，下次运行重新处理）；
+   加 --force 则全部重新解析、写入并复制附件
+8. 旧数据没有 structure_hash / entry_num / elements / chemsys 字段时，先运行一次回填：
+       python 012-POSCAR数据解析与MongoDB入库工具.py --backfill
+   入库前若发现没有 structure_hash 的文档会自动回填；回填后仍无法计算指纹（缺少结构信息）的文档
+   无法参与去重，此时拒绝入库（确认无误后可加 --allow-unhashed）
+9. 写入以 structure_hash 为条件 upsert，entry_id 只在插入时写入（$setOnInsert）；多个任务同时写入同一新结构时，
+   后写入的一方遇到唯一索引冲突会改为更新已有文档并沿用其 entry_id（预留的编号会空出）
 
 📅 作者：张圳锐
 """
-from pymongo import MongoClient
+from pymongo import MongoClient, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import hashlib
 import os
-import shutil
+import sqlite3
 import json
 import ast
 from datetime import datetime, timezone
 import re
 import json
 
-# 读取配置文件
-with open("config.json", "r") as f:
-    config = json.load(f)["mongodb"]
-
-client = MongoClient(config["uri"])
-collection = client[config["db_name"]][config["collection_name"]]
+from structure_utils import document_structure_hash, entry_num_from_id, chemsys_fields
+from poscar_utils import parse_poscar
+from frontend_view import view_collection, ensure_view_indexes, refresh_view, ViewRefresher
+from attachment_store import AttachmentStore, ParallelLinker
+from schema_migrations import LATEST_SCHEMA_VERSION
 
+WRONG_REPORT = '012-poscar2mondodb_wrong.txt'
+MANIFEST_PATH = '012-ingest_manifest.sqlite'
+# 附件 store 默认位于每个工作目录下（与 ID-n/ 同一文件系统才能硬链接）
+STORE_DIRNAME = '.attachment_store'
+# 待完成的附件任务达到该数量时等待其完成并提交清单
+LINK_DRAIN_EVERY = 256
 
 
 # ===============================================
@@ -98,34 +121,20 @@ def extract_formula_from_path(file_path):
     return None
 
 
-def parse_poscar_composition(path, current_count):
-    with open(path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-
-    # 晶格矩阵
-    lattice_matrix = []
-    for i in range(2, 5):
-        lattice_matrix.append([float(x) for x in lines[i].split()])
-
-    # 第6行为元素名行
-    elements = lines[5].split()
-    counts = list(map(int, lines[6].split()))
-    composition = dict(zip(elements, counts))
+def parse_poscar_composition(path, chem_dict):
+    """
+    解析 CONTCAR 并关联超导相关属性，生成待入库文档（entry_id 由写入阶段分配）
 
-    # 原子坐标
-    sites = []
-    index = 8
+    参数:
+        path: CONTCAR 文件路径
+        chem_dict: 化学式 -> 属性 的字典（来自 '合并后的数据.txt'）
 
-    # 遍历每种元素及其对应的数量
-    for element, count in zip(elements, counts):
-        for _ in range(count):
-            coords = list(map(float, lines[index].split()))
-            sites.append({
-                "species": [{"element": element, "occu": 1}],
-                "abc": coords,
-                "label": element
-            })
-            index += 1  # 更新索引以指向下一个原子的位置
+    返回:
+        文档字典；化学式不在字典中时返回 "error"
+    """
+    # 坐标块直接读入数组（已处理缩放系数、Cartesian 坐标与 Selective dynamics），sites 按需从数组生成
+    poscar = parse_poscar(path)
+    composition = poscar.composition
 
     #  超导相关
     #  这里需要你修改
@@ -145,18 +154,22 @@ def parse_poscar_composition(path, current_count):
             # 只有 a 不是 None 时，才进行字符串操作
             cleaned_str = a.replace('\n', '').replace(' ', '')
             low_three = ast.literal_eval(cleaned_str)
-        current_utc_time = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M%z")
+        # 以 BSON 日期存储（而非字符串），便于 011 按修改时间做增量备份
+        current_utc_time = datetime.now(timezone.utc)
 
         result = {
-            "entry_id": f"ID-{current_count}",
+            "entry_id": None,  # 由写入阶段分配
+            "entry_num": None,  # entry_id 的数值部分，用于索引排序与范围查询
+            "structure_hash": poscar.structure_hash(),
+            "schema_version": LATEST_SCHEMA_VERSION,  # 新文档已是最新 schema，迁移时无需处理
             "composition": composition,
+            # 化学体系派生字段（elements 多键索引 / chemsys 索引），供 003 按化学体系查询
+            **chemsys_fields(composition),
             "original-structure": "ThB5(P4/mmm)",
             "datatime": current_utc_time,
+            "modified_at": current_utc_time,  # 最后修改时间（迁移、回填、撤销删除也会更新），011 增量备份依据
             "structure": {
-                "lattice": {
-                    "matrix": lattice_matrix,
-                },
-                "sites": sites,
+                **poscar.to_structure(),
                 "Superconductivity_related_properties": {
                     "lambda_gamma": lambda_gamma if 'lambda_gamma' in locals() and lambda_gamma is not None else None,
                     "energy_above_hull": energy_relative_to_convex_hull if 'energy_relative_to_convex_hull' in locals() and energy_relative_to_convex_hull is not None else None,
@@ -168,45 +181,12 @@ def parse_poscar_composition(path, current_count):
         }
         return result
     else:
-        print(material_name + " 该化学式不在字典中")
-        with open('012-poscar2mondodb_wrong.txt', 'a', encoding='utf-8') as f:
-            f.write(path + '\n')
+        print(f"{material_name} 该化学式不在字典中")
         return "error"
 
 
-# 获取当前最大的entry_id数值，用于递增计数
-def get_max_entry_id(collection):
-    # 按数字部分降序排序，取第一条（修正排序逻辑）
-    pipeline = [
-        {
-            "$addFields": {
-                "entry_num": {
-                    "$toInt": {
-                        "$arrayElemAt": [{"$split": ["$entry_id", "-"]}, 1]
-                    }
-                }
-            }
-        },
-        {"$sort": {"entry_num": -1}},
-        {"$limit": 1}
-    ]
-    max_docs = list(collection.aggregate(pipeline))
-    if not max_docs or "entry_id" not in max_docs[0]:
-        return 0  # 如果没有数据，从1开始
-    # 提取数字部分（例如从"ID-5"中提取5）
-    return int(max_docs[0]["entry_id"].split("-")[-1])
-
-
-# 获取起始计数
-start_count = get_max_entry_id(collection) + 1  # 下一个要分配的ID
-# start_count = 1  # 如果需要从1开始计数，可以将此行取消注释
-current_count = start_count  # 当前计数
-
-# 定义文件夹路径列表
-folder_paths = [
-    r"D:\School\SophomoreStudyMaterials\00MachineLearning\7.fuwuqi\work\work",
-]
-for folder_path in folder_paths:
+# 读取工作目录下的 '合并后的数据.txt'，构建 化学式 -> 属性 的字典
+def load_chem_dict(folder_path):
     target_file_path = os.path.join(folder_path, '合并后的数据.txt')
     chem_dict = {}
     # 检查文件是否存在（可选）
@@ -239,83 +219,539 @@ for folder_path in folder_paths:
                         'formation_e (eV/atom)': float(formation_e),
                         'E_d (eV/atom)': float(e_d)
                     }
-    print(folder_path)
-    for file_path in os.listdir(folder_path):
-        if "-" in file_path:
-            # formula = file_path.split("-")[1]  # 提取化学式
-
-            formula = extract_formula_from_path(file_path)
-            gamma_png = os.path.join(folder_path, file_path, "gamma-figsum.png")
-            omega = os.path.join(folder_path, file_path, "omega.dat")
-
-            file_path = os.path.join(folder_path, file_path, "CONTCAR")
-
-            print(file_path, current_count)
-            # 生成包含 entry_id 的结果
-            if parse_poscar_composition(file_path, current_count) != "error":
-                result = parse_poscar_composition(file_path, current_count)
-                print(f"Inserting document with entry_id: {result['entry_id']}")
-                # 唯一判断表示
-                lattice = result["structure"]["lattice"]
-                sites = result["structure"]["sites"]
-
-                # 准备要替换的数据，注意：不能包含_id字段（如果有的话）
-                data_to_replace = result.copy()
-                if '_id' in data_to_replace:
-                    del data_to_replace['_id']  # 移除_id字段，因为MongoDB不允许替换_id
-
-                query = {"structure.lattice": lattice
-                    , "structure.sites": sites}
-                existing_doc = collection.find_one(query)
-
-                if existing_doc:
-                    print(existing_doc)
-                print("*****" * 10)
-
-                if existing_doc:
-                    # 保留原有的entry_id
-                    data_to_replace['entry_id'] = existing_doc['entry_id']
-
-                # 使用replace_one并设置upsert=True
-                replace_result = collection.replace_one(
-                    query,
-                    data_to_replace,
-                    upsert=True
-                )
+    return chem_dict
+
+
+# 某个化学式在 '合并后的数据.txt' 中对应属性行的哈希，属性行变化时需要重新入库
+def chem_row_hash(chem_dict, material_name):
+    row = chem_dict.get(material_name)
+    payload = json.dumps(row, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def attachments_signature(work_dir):
+    """附件（gamma-figsum.png / omega.dat）的大小与修改时间，附件被修改后需要重新归档"""
+    parts = []
+    for name in ("gamma-figsum.png", "omega.dat"):
+        try:
+            st = os.stat(os.path.join(work_dir, name))
+            parts.append(f"{st.st_size}:{st.st_mtime_ns}")
+        except OSError:
+            parts.append("-")
+    return "|".join(parts)
+
 
-                entry_id = data_to_replace['entry_id']
+class IngestManifest:
+    """
+    本地入库清单（SQLite），以 CONTCAR 路径为键，记录文件大小、修改时间、内容哈希、
+    对应属性行的哈希、附件签名以及分配到的 entry_id，重复运行时据此跳过未变化的工作目录
+    """
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS manifest (
+                contcar_path TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime_ns INTEGER,
+                content_hash TEXT,
+                row_hash TEXT,
+                entry_id TEXT,
+                updated_at TEXT
+            )
+        """)
+        # 旧版清单没有附件签名列：补上后旧记录的签名为空，下次运行会重新处理一次
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(manifest)")]
+        if "attachments_sig" not in columns:
+            self.conn.execute("ALTER TABLE manifest ADD COLUMN attachments_sig TEXT")
+        self.conn.commit()
+
+    def _get(self, contcar_path):
+        return self.conn.execute(
+            "SELECT size, mtime_ns, content_hash, row_hash, entry_id, attachments_sig FROM manifest "
+            "WHERE contcar_path = ?",
+            (contcar_path,),
+        ).fetchone()
+
+    def stat_unchanged(self, contcar_path, row_hash):
+        """只比较 stat、属性行哈希与附件签名，不读取文件内容（用于提交解析任务前的快速筛选）"""
+        row = self._get(contcar_path)
+        if row is None:
+            return False
+        try:
+            st = os.stat(contcar_path)
+        except OSError:
+            return False
+        return (row[0] == st.st_size and row[1] == st.st_mtime_ns and row[3] == row_hash
+                and row[5] == attachments_signature(os.path.dirname(contcar_path)))
+
+    def content_unchanged(self, item):
+        """stat 变了但内容、属性行与附件都没变（例如文件被重新拷贝）时返回上次分配的 entry_id，否则返回 None"""
+        row = self._get(item["file_path"])
+        if (row is None or row[2] != item["content_hash"] or row[3] != item["row_hash"]
+                or row[5] != item["attachments_sig"]):
+            return None
+        return row[4]
+
+    def record(self, item):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO manifest "
+            "(contcar_path, size, mtime_ns, content_hash, row_hash, entry_id, updated_at, attachments_sig) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (item["file_path"], item["size"], item["mtime_ns"], item["content_hash"], item["row_hash"],
+             item["entry_id"], datetime.now(timezone.utc).isoformat(), item["attachments_sig"]),
+        )
+
+    def invalidate_attachments(self, contcar_paths):
+        """附件归档失败的目录清空附件签名，下次运行时不会被判定为未变化"""
+        self.conn.executemany("UPDATE manifest SET attachments_sig = NULL WHERE contcar_path = ?",
+                              [(path,) for path in contcar_paths])
+
+    def commit(self):
+        self.conn.commit()
+
+
+# ========== 解析阶段（在子进程中运行） ==========
+_worker_chem_dict = {}
+
+
+def _init_parse_worker(chem_dict):
+    # 每个子进程只接收一次属性字典，避免随每个任务重复序列化
+    global _worker_chem_dict
+    _worker_chem_dict = chem_dict
+
+
+def parse_work_dir(work_dir):
+    """
+    解析单个工作目录（每个 CONTCAR 只解析一次）
+
+    返回:
+        字典，包含 file_path / formula / gamma_png / omega / result / error；
+        解析失败时 result 为 None，error 为失败原因
+    """
+    file_path = os.path.join(work_dir, "CONTCAR")
+    item = {
+        "file_path": file_path,
+        "formula": extract_formula_from_path(os.path.basename(work_dir)),
+        "gamma_png": os.path.join(work_dir, "gamma-figsum.png"),
+        "omega": os.path.join(work_dir, "omega.dat"),
+        "result": None,
+        "error": None,
+        "entry_id": None,
+        "row_hash": chem_row_hash(_worker_chem_dict, extract_formula_from_path(file_path)),
+        "attachments_sig": attachments_signature(work_dir),
+    }
+    try:
+        st = os.stat(file_path)
+        with open(file_path, 'rb') as f:
+            item["content_hash"] = hashlib.sha1(f.read()).hexdigest()
+        item["size"], item["mtime_ns"] = st.st_size, st.st_mtime_ns
+        result = parse_poscar_composition(file_path, _worker_chem_dict)
+    except Exception as e:
+        item["error"] = f"{type(e).__name__}: {e}"
+        return item
+    if result == "error":
+        item["error"] = "化学式不在字典中"
+    else:
+        # 归档到 ID-n/ 下的结构文件名，前端集合据此生成 posfile 的 OSS key
+        result["structure_file"] = f"{item['formula']}.vasp"
+        item["result"] = result
+    return item
+
+
+# 获取当前最大的entry_id数值，仅在计数器首次初始化时使用
+def get_max_entry_id(collection):
+    # 已有 entry_num 的文档直接走索引取最大值
+    max_doc = collection.find_one({"entry_num": {"$ne": None}}, {"entry_num": 1}, sort=[("entry_num", -1)])
+    max_num = max_doc["entry_num"] if max_doc else 0
 
-                if replace_result.upserted_id is not None:
-                    print(f"{current_count} 新文档已插入: {file_path} (ID: {entry_id})")
-                    current_count += 1
+    # 尚未回填 entry_num 的旧文档按字符串解析（{"entry_num": None} 同样可以走索引，回填后为空集）
+    pipeline = [
+        {"$match": {"entry_num": None, "entry_id": {"$exists": True}}},
+        {
+            "$addFields": {
+                "entry_num": {
+                    "$toInt": {
+                        "$arrayElemAt": [{"$split": ["$entry_id", "-"]}, 1]
+                    }
+                }
+            }
+        },
+        {"$sort": {"entry_num": -1}},
+        {"$limit": 1}
+    ]
+    max_docs = list(collection.aggregate(pipeline))
+    if not max_docs or "entry_id" not in max_docs[0]:
+        return max_num  # 如果没有数据，从1开始
+    # 提取数字部分（例如从"ID-5"中提取5）
+    return max(max_num, int(max_docs[0]["entry_id"].split("-")[-1]))
+
+
+class EntryIdAllocator:
+    """
+    基于计数器集合的 entry_id 分配器
+
+    计数器文档形如 {"_id": "entry_id", "seq": 当前已分配的最大编号}，
+    每次通过 find_one_and_update + $inc 原子地预留一段连续编号，
+    多个入库任务（即使在不同节点上）拿到的号段互不重叠，且无需扫描数据集合。
+    """
+
+    def __init__(self, collection, counters, name="entry_id"):
+        self.counters = counters
+        self.name = name
+        if counters.find_one({"_id": name}) is None:
+            self._seed(get_max_entry_id(collection))
+
+    def _seed(self, max_existing):
+        # $max 保证并发初始化时计数器只会被推高，不会回退
+        try:
+            self.counters.update_one({"_id": self.name}, {"$max": {"seq": max_existing}}, upsert=True)
+        except DuplicateKeyError:
+            # 另一个任务同时创建了计数器文档，重试一次即为普通更新
+            self.counters.update_one({"_id": self.name}, {"$max": {"seq": max_existing}})
+
+    def reserve(self, n):
+        """预留 n 个连续编号，返回 range 对象"""
+        if n <= 0:
+            return range(0)
+        doc = self.counters.find_one_and_update(
+            {"_id": self.name},
+            {"$inc": {"seq": n}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        end = doc["seq"]
+        return range(end - n + 1, end + 1)
+
+
+# 创建去重所需的索引
+def ensure_indexes(collection):
+    # partialFilterExpression：尚未回填指纹的旧文档不参与唯一约束
+    try:
+        collection.create_index(
+            "structure_hash",
+            unique=True,
+            partialFilterExpression={"structure_hash": {"$exists": True}},
+        )
+    except OperationFailure as e:
+        print(f"❌ 创建 structure_hash 唯一索引失败（可能存在重复结构，可用 002 排查）: {e}")
+        raise
+    # 数值 ID：排序、取最大编号和 ID 范围查询都走索引
+    collection.create_index("entry_num")
+    # 修改时间：011 增量备份按这两个字段筛选
+    collection.create_index("datatime")
+    collection.create_index("modified_at")
+    # 组成：010 按 composition 查询候选结构
+    collection.create_index("composition")
+    # 化学体系：elements 为多键索引（包含所有元素），chemsys 用于精确 / 子集查询
+    collection.create_index("elements")
+    collection.create_index("chemsys")
+
+
+# 为已有文档回填 structure_hash / entry_num / elements / chemsys 等派生字段（一次性迁移）
+def backfill_derived_fields(collection, batch_size=1000):
+    projection = {"entry_id": 1, "structure_hash": 1, "entry_num": 1, "chemsys": 1,
+                  "composition": 1, "structure.lattice": 1, "structure.sites": 1}
+    query = {"$or": [{"structure_hash": {"$exists": False}}, {"entry_num": {"$exists": False}},
+                     {"chemsys": {"$exists": False}}]}
+    cursor = collection.find(query, projection, batch_size=batch_size)
+
+    ops = []
+    updated = 0
+    skipped = 0
+    for doc in cursor:
+        fields = {}
+        if "structure_hash" not in doc:
+            h = document_structure_hash(doc)
+            if h is not None:
+                fields["structure_hash"] = h
+        if "entry_num" not in doc:
+            n = entry_num_from_id(doc.get("entry_id"))
+            if n is not None:
+                fields["entry_num"] = n
+        if "chemsys" not in doc and doc.get("composition"):
+            fields.update(chemsys_fields(doc["composition"]))
+        if not fields:
+            skipped += 1
+            continue
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": fields, "$currentDate": {"modified_at": True}}))
+        if len(ops) >= batch_size:
+            updated += collection.bulk_write(ops, ordered=False).modified_count
+            ops = []
+            print(f"已回填 {updated} 条")
+    if ops:
+        updated += collection.bulk_write(ops, ordered=False).modified_count
+
+    print(f"✅ 回填完成：更新 {updated} 条，缺少结构或 entry_id 信息跳过 {skipped} 条")
+    ensure_indexes(collection)
+
+
+# 归档结构文件与附件到以 entry_id 命名的文件夹
+# 附件先存入内容寻址的 store，再以硬链接（或 reflink / 复制）放入 ID-n/，由 linker 的线程池并发完成
+def copy_attachments(file_path, gamma_png, omega, entry_id, formula, linker):
+    base_dir = os.path.dirname(file_path)  # 获取文件所在目录
+    target_dir = os.path.join(base_dir, entry_id)  # 目标文件夹路径
+
+    # 以 CONTCAR 路径为 key：任一附件归档失败时，清单中该目录的附件签名会被清空，下次运行重新处理
+    linker.submit(file_path, os.path.join(target_dir, f"{formula}.vasp"), key=file_path)
+    linker.submit(gamma_png, os.path.join(target_dir, os.path.basename(gamma_png)), key=file_path)
+    linker.submit(omega, os.path.join(target_dir, os.path.basename(omega)), key=file_path)
+
+
+def upsert_update(result, entry_id):
+    """
+    以 structure_hash 为条件的 upsert：内容字段用 $set 覆盖，entry_id / entry_num 只在插入时写入，
+    并发任务即使同时写入同一结构也不会改写已有文档的 entry_id
+
+    返回:
+        (filter, update)
+    """
+    content = {k: v for k, v in result.items() if k not in ("_id", "entry_id", "entry_num")}
+    return (
+        {"structure_hash": result["structure_hash"]},
+        {"$set": content,
+         "$setOnInsert": {"entry_id": entry_id, "entry_num": entry_num_from_id(entry_id)}},
+    )
+
+
+def _duplicate_key_indexes(error):
+    """BulkWriteError 中唯一索引冲突（11000）的操作下标；含其他错误时重新抛出"""
+    write_errors = error.details.get("writeErrors", [])
+    if any(e.get("code") != 11000 for e in write_errors):
+        raise error
+    return [e["index"] for e in write_errors]
+
+
+# 批量模式：一次 $in 查询解析已有 entry_id，再用一次无序 bulk_write 完成整批 upsert
+def flush_batch(collection, batch, allocator, linker, view=None):
+    """
+    写入一批解析结果
+
+    参数:
+        collection: MongoDB 集合
+        batch: 列表，元素为 {"result", "file_path", "formula", "gamma_png", "omega"}
+        allocator: EntryIdAllocator，整批新结构一次性预留编号
+        linker: ParallelLinker，附件归档在其线程池中异步完成
+        view: 前端集合，不为 None 时同步刷新本批写入的文档
+    """
+    # 同一批次内结构相同的只写一次（后出现的覆盖先出现的，与逐条模式一致）
+    by_hash = {}
+    for item in batch:
+        by_hash[item["result"]["structure_hash"]] = item["result"]
+    hashes = list(by_hash)
+
+    existing = {
+        doc["structure_hash"]: doc["entry_id"]
+        for doc in collection.find({"structure_hash": {"$in": hashes}},
+                                   {"_id": 0, "structure_hash": 1, "entry_id": 1})
+    }
+
+    new_ids = iter(allocator.reserve(sum(1 for h in by_hash if h not in existing)))
+    operations = []
+    for h, result in by_hash.items():
+        entry_id = existing[h] if h in existing else f"ID-{next(new_ids)}"
+        operations.append(UpdateOne(*upsert_update(result, entry_id), upsert=True))
+
+    try:
+        bulk_result = collection.bulk_write(operations, ordered=False)
+        upserted, matched = bulk_result.upserted_count, bulk_result.matched_count
+    except BulkWriteError as e:
+        # 其他任务在查询之后插入了同一结构：重试这些操作，此时会匹配到已有文档并只更新内容
+        retry = [operations[i] for i in _duplicate_key_indexes(e)]
+        upserted, matched = e.details["nUpserted"], e.details["nMatched"]
+        matched += collection.bulk_write(retry, ordered=False).matched_count
+        print(f"⚠️ {len(retry)} 个结构已被其他入库任务写入，改为更新已有文档")
+
+    # 以数据库中的实际 entry_id 为准（并发写入时可能不是本任务预留的编号）
+    final_ids = {
+        doc["structure_hash"]: doc["entry_id"]
+        for doc in collection.find({"structure_hash": {"$in": hashes}},
+                                   {"_id": 0, "structure_hash": 1, "entry_id": 1})
+    }
+    for h, result in by_hash.items():
+        result["entry_id"] = final_ids[h]
+        result["entry_num"] = entry_num_from_id(final_ids[h])
+    print(f"批次写入完成：{len(batch)} 个文件 / {len(operations)} 个结构，"
+          f"新插入 {upserted} 条，更新已有 {matched} 条")
+    if view is not None:
+        refresh_view(collection, view, {"structure_hash": {"$in": hashes}})
+
+    for item in batch:
+        entry_id = by_hash[item["result"]["structure_hash"]]["entry_id"]
+        item["entry_id"] = entry_id
+        copy_attachments(item["file_path"], item["gamma_png"], item["omega"], entry_id, item["formula"], linker)
+
+
+# 逐条模式：每个结构一次 find_one + 一次 upsert；前端集合由 refresher 累积成批后刷新
+def write_single(collection, item, allocator, linker, refresher=None):
+    file_path = item["file_path"]
+    result = item["result"]
+    print(file_path)
+    # 唯一判断表示：规范化结构指纹（走 structure_hash 唯一索引）
+    query = {"structure_hash": result["structure_hash"]}
+    existing_doc = collection.find_one(query, {"entry_id": 1})
+
+    if existing_doc:
+        print(existing_doc)
+    print("*****" * 10)
+
+    if existing_doc:
+        # 保留原有的entry_id
+        entry_id = existing_doc['entry_id']
+    else:
+        entry_id = f"ID-{allocator.reserve(1)[0]}"
+        print(f"Inserting document with entry_id: {entry_id}")
+
+    # upsert：entry_id 只在插入时写入；其他任务抢先插入同一结构时重试一次，改为更新已有文档
+    try:
+        update_result = collection.update_one(*upsert_update(result, entry_id), upsert=True)
+    except DuplicateKeyError:
+        update_result = collection.update_one(*upsert_update(result, entry_id), upsert=True)
+
+    if update_result.upserted_id is None:
+        # 以数据库中的实际 entry_id 为准
+        entry_id = collection.find_one(query, {"entry_id": 1})["entry_id"]
+    result["entry_id"], result["entry_num"] = entry_id, entry_num_from_id(entry_id)
+    if refresher is not None:
+        refresher.add(result["structure_hash"])
+
+    if update_result.upserted_id is not None:
+        print(f"新文档已插入: {file_path} (ID: {entry_id})")
+    else:
+        print(f"结构已存在!!!!!!!!!!!!!!!!!!，已强制更新文档: {file_path} (ID: {entry_id})")
+        print("!!!!!!!!!!" * 20)
+
+    item["entry_id"] = entry_id
+    copy_attachments(file_path, item["gamma_png"], item["omega"], entry_id, item["formula"], linker)
+
+
+def check_unhashed(collection, allow_unhashed=False):
+    """
+    没有 structure_hash 的旧文档无法参与去重，否则相同结构会以新的 entry_id 重复插入：
+    先自动回填，回填后仍有无法计算指纹的文档时拒绝入库（allow_unhashed=True 时只警告）
+    """
+    if collection.find_one({"structure_hash": {"$exists": False}}, {"_id": 1}) is None:
+        return
+    print("⚠️ 存在尚未回填 structure_hash 的文档，入库前先执行回填（同 --backfill）")
+    backfill_derived_fields(collection)
+    remaining = collection.count_documents({"structure_hash": {"$exists": False}})
+    if not remaining:
+        return
+    message = f"{remaining} 条文档缺少结构信息，无法计算 structure_hash，入库时不能与其去重"
+    if not allow_unhashed:
+        print(f"❌ {message}；请先检查这些文档，确认无误后加 --allow-unhashed 继续")
+        raise SystemExit(1)
+    print(f"⚠️ {message}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="POSCAR数据解析与MongoDB入库工具")
+    parser.add_argument("--backfill", action="store_true",
+                        help="为已有文档回填 structure_hash / entry_num / chemsys 并创建索引，然后退出")
+    parser.add_argument("--batch-size", type=int, default=0,
+                        help="批量模式每批的结构数；为 0 时逐个文件查询并写入（默认）")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="解析 CONTCAR 的进程数，默认使用全部 CPU 核心")
+    parser.add_argument("--force", action="store_true",
+                        help="忽略入库清单，重新解析、写入所有目录并复制附件")
+    parser.add_argument("--manifest", default=MANIFEST_PATH,
+                        help=f"入库清单 SQLite 文件路径（默认 {MANIFEST_PATH}）")
+    parser.add_argument("--store-dir", default=None,
+                        help=f"附件内容寻址 store 目录，默认为各工作目录下的 {STORE_DIRNAME}")
+    parser.add_argument("--copy-workers", type=int, default=8, help="归档附件的线程数")
+    parser.add_argument("--allow-unhashed", action="store_true",
+                        help="回填后仍有无法计算 structure_hash 的文档时仍然入库")
+    args = parser.parse_args()
+
+    # 读取配置文件
+    with open("config.json", "r") as f:
+        config = json.load(f)["mongodb"]
+
+    client = MongoClient(config["uri"])
+    collection = client[config["db_name"]][config["collection_name"]]
+
+    if args.backfill:
+        backfill_derived_fields(collection)
+        raise SystemExit(0)
+
+    check_unhashed(collection, args.allow_unhashed)
+    ensure_indexes(collection)
+
+    # entry_id 分配器（计数器不存在时以现有最大编号初始化）
+    counters = client[config["db_name"]][config.get("counters_collection", "counters")]
+    allocator = EntryIdAllocator(collection, counters)
+    # 前端集合随入库增量更新（全量重建见 007 --rebuild）
+    view = view_collection(client[config["db_name"]], config)
+    ensure_view_indexes(view)
+    refresher = ViewRefresher(collection, view)
+    manifest = IngestManifest(args.manifest)
+
+    # 定义文件夹路径列表
+    folder_paths = [
+        r"D:\School\SophomoreStudyMaterials\00MachineLearning\7.fuwuqi\work\work",
+    ]
+    for folder_path in folder_paths:
+        chem_dict = load_chem_dict(folder_path)
+        print(folder_path)
+        # formula = file_path.split("-")[1]  # 提取化学式
+        work_dirs = [os.path.join(folder_path, name) for name in os.listdir(folder_path) if "-" in name]
+        if not args.force:
+            # 快速筛选：CONTCAR 的 stat 与属性行哈希都和清单一致的目录直接跳过，不提交解析
+            total = len(work_dirs)
+            work_dirs = [
+                d for d in work_dirs
+                if not manifest.stat_unchanged(
+                    os.path.join(d, "CONTCAR"),
+                    chem_row_hash(chem_dict, extract_formula_from_path(os.path.join(d, "CONTCAR"))),
+                )
+            ]
+            print(f"共 {total} 个目录，其中 {total - len(work_dirs)} 个未变化，已跳过")
+
+        # 解析阶段在进程池中并行执行，结果按目录顺序流式交给写入阶段（分配 entry_id、写 MongoDB）
+        linker = ParallelLinker(AttachmentStore(args.store_dir or os.path.join(folder_path, STORE_DIRNAME)),
+                                args.copy_workers)
+        batch = []
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_parse_worker,
+                                 initargs=(chem_dict,)) as executor, \
+                open(WRONG_REPORT, 'a', encoding='utf-8') as wrong_file:
+            for item in executor.map(parse_work_dir, work_dirs, chunksize=8):
+                if item["result"] is None:
+                    print(f"❌ 解析失败，已记录到 {WRONG_REPORT}: {item['file_path']} ({item['error']})")
+                    wrong_file.write(item["file_path"] + '\n')
+                    continue
+
+                if not args.force:
+                    previous_entry_id = manifest.content_unchanged(item)
+                    if previous_entry_id is not None:
+                        # 内容与属性行均未变化，只刷新清单中的 stat
+                        item["entry_id"] = previous_entry_id
+                        manifest.record(item)
+                        continue
+
+                if args.batch_size > 0:
+                    # 批量模式：收集解析结果，凑满一批后统一写入
+                    batch.append(item)
+                    if len(batch) >= args.batch_size:
+                        flush_batch(collection, batch, allocator, linker, view)
+                        for done in batch:
+                            manifest.record(done)
+                        batch = []
                 else:
-                    print(f"{current_count} 结构已存在!!!!!!!!!!!!!!!!!!，已强制替换文档: {file_path} (ID: {entry_id})")
-                    print("!!!!!!!!!!" * 20)
-
-                base_dir = os.path.dirname(file_path)  # 获取文件所在目录
-                target_dir = os.path.join(base_dir, entry_id)  # 目标文件夹路径
-                os.makedirs(target_dir, exist_ok=True)  # 创建文件夹（如果不存在）
-
-                target_file = os.path.join(target_dir, f"{formula}.vasp")
-
-                # 移动文件
-                try:
-                    shutil.copy2(file_path, target_file)
-                except FileNotFoundError:
-                    print(f"文件不存在，跳过: {file_path}")
-                except Exception as e:
-                    print(f"复制文件时发生未知错误: {file_path} -> {str(e)}")
-
-                try:
-                    shutil.copy2(gamma_png, target_dir)
-                except FileNotFoundError:
-                    print(f"文件不存在，跳过: {gamma_png}")
-                except Exception as e:
-                    print(f"复制文件时发生未知错误: {gamma_png} -> {str(e)}")
-
-                try:
-                    shutil.copy2(omega, target_dir)
-                except FileNotFoundError:
-                    print(f"文件不存在，跳过: {omega}")
-                except Exception as e:
-                    print(f"复制文件时发生未知错误: {omega} -> {str(e)}")
+                    write_single(collection, item, allocator, linker, refresher)
+                    manifest.record(item)
+
+                # 清单只在对应的附件归档完成、前端集合刷新后提交，中断时未提交的目录下次会重新处理
+                if len(linker.pending) >= LINK_DRAIN_EVERY:
+                    manifest.invalidate_attachments(linker.drain())
+                    refresher.flush()
+                    manifest.commit()
+
+        # 写入最后一批（不足 batch_size 的部分）
+        if batch:
+            flush_batch(collection, batch, allocator, linker, view)
+            for done in batch:
+                manifest.record(done)
+        manifest.invalidate_attachments(linker.close())
+        refresher.flush()
+        manifest.commit()
+        print(f"附件归档：{linker.stats}")
@@ -9,6 +9,8 @@ from pymongo import MongoClient
 import datetime
 import glob
 
+from structure_utils import chemsys_fields
+
 # leading keywords
 keys_edft = ["decomposition", "above_hull"]
 
@@ -184,7 +186,10 @@ def prep():
                                      entry_id="MMD-" + str(ct),
                                      parameters=parameters)
 
-        cses.append(cse.as_dict())
+        entry = cse.as_dict()
+        # 化学体系派生字段，与 012 入库的文档一致，可按 elements / chemsys 索引查询
+        entry.update(chemsys_fields(el.symbol for el in st.composition.elements))
+        cses.append(entry)
 
     # END loop
     return cses
@@ -196,6 +201,8 @@ if __name__ == "__main__":
 
     # use "test" database
     db = client.test
+    db.TEST.create_index("elements")
+    db.TEST.create_index("chemsys")
 
     # make entries
     ret = prep()
@@ -0,0 +1,154 @@
+"""
+🌟 脚本名称：MongoDB 备份恢复工具（配合 011-数据库备份.py）
+
+📌 功能概述：
+读取 011 生成的备份链清单（{prefix}-manifest.json），先回放全量备份，再按顺序回放各个增量备份，
+最后根据清单中记录的索引定义重建索引。
+
+🔧 实现要点：
+- 全量文件：按批次并行 insert_many(ordered=False)，已存在的 _id 计为跳过，其它写入错误直接报错中止
+- 增量文件：按批次并行 bulk_write(ReplaceOne(upsert=True))，按 _id 覆盖旧版本；
+  各增量之间依次执行，保证较新的版本最后写入
+- 先加载数据、后建索引，避免加载过程中逐条维护索引
+
+🚀 使用示例：
+    python 014-数据库恢复.py --manifest ./export/a-manifest.json --drop
+    python 014-数据库恢复.py --manifest ./export/a-manifest.json --target-collection restore_test
+
+📅 作者：张圳锐
+"""
+from pymongo import MongoClient, IndexModel, ReplaceOne
+from pymongo.errors import BulkWriteError
+from bson import json_util
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import argparse
+import gzip
+import io
+import json
+import os
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+BATCH_SIZE = 1000
+WORKERS = 8
+
+
+def open_backup_file(path, compression):
+    if compression == "gzip":
+        return gzip.open(path, "rt", encoding="utf-8")
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("读取 zstd 备份需要先安装 zstandard：pip install zstandard")
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, "rb")), encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def iter_batches(paths, compression, batch_size):
+    """逐行读取备份文件，按 batch_size 分批产出文档列表"""
+    batch = []
+    for path in paths:
+        with open_backup_file(path, compression) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                batch.append(json_util.loads(line))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+    if batch:
+        yield batch
+
+
+def _insert_batch(collection, docs):
+    try:
+        return len(collection.insert_many(docs, ordered=False).inserted_ids), 0
+    except BulkWriteError as e:
+        # 已存在的 _id（重复恢复）不视为错误；其它写入错误（校验失败、文档过大等）继续抛出，恢复中止
+        write_errors = e.details.get("writeErrors", [])
+        if any(err.get("code") != 11000 for err in write_errors):
+            raise
+        return e.details.get("nInserted", 0), len(write_errors)
+
+
+def _upsert_batch(collection, docs):
+    result = collection.bulk_write([ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in docs],
+                                   ordered=False)
+    # matched 包含内容未变化的文档（modified 不计入），与 upserted 相加才是本批回放的文档数
+    return result.upserted_count + result.matched_count, 0
+
+
+def replay(collection, paths, compression, write_batch, batch_size=BATCH_SIZE, workers=WORKERS):
+    """
+    并行回放一组备份文件（同一环节内的文档 _id 互不重复，可以并行写入）
+
+    返回:
+        (写入条数, 跳过的重复条数)
+    """
+    written = skipped = 0
+    pending = set()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for docs in iter_batches(paths, compression, batch_size):
+            # 限制在途批次数量，保证内存占用有上限
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    n, dup = future.result()
+                    written += n
+                    skipped += dup
+            pending.add(executor.submit(write_batch, collection, docs))
+        for future in pending:
+            n, dup = future.result()
+            written += n
+            skipped += dup
+    return written, skipped
+
+
+def rebuild_indexes(collection, indexes):
+    models = []
+    for index in indexes:
+        options = {k: v for k, v in index.items() if k not in ("key", "v", "ns")}
+        models.append(IndexModel([tuple(k) for k in index["key"]], **options))
+    if models:
+        collection.create_indexes(models)
+    return [m.document["name"] for m in models]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="回放 011 生成的全量 + 增量备份")
+    parser.add_argument("--manifest", default="./export/a-manifest.json", help="备份链清单路径")
+    parser.add_argument("--target-collection", default=None, help="恢复到的集合名，默认使用 config.json 中的集合")
+    parser.add_argument("--drop", action="store_true", help="恢复前先删除目标集合")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="每批写入的文档数")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="并行写入的线程数")
+    args = parser.parse_args()
+
+    # 读取配置文件
+    with open("config.json", "r") as f:
+        config = json.load(f)["mongodb"]
+
+    client = MongoClient(config["uri"])
+    collection = client[config["db_name"]][args.target_collection or config["collection_name"]]
+
+    with open(args.manifest, "r", encoding="utf-8") as f:
+        manifest = json_util.loads(f.read())
+    backup_dir = os.path.dirname(os.path.abspath(args.manifest))
+
+    if args.drop:
+        print(f"⚠️ 删除目标集合 {collection.name}")
+        collection.drop()
+
+    for step in manifest["chain"]:
+        paths = [os.path.join(backup_dir, name) for name in step["files"]]
+        write_batch = _insert_batch if step["type"] == "full" else _upsert_batch
+        written, skipped = replay(collection, paths, step.get("compression", "gzip"), write_batch,
+                                  args.batch_size, args.workers)
+        print(f"✅ 已回放 {step['type']} 备份（检查点 {step['checkpoint']}）：写入 {written} 条，跳过已存在 {skipped} 条")
+
+    names = rebuild_indexes(collection, manifest.get("indexes", []))
+    print(f"✅ 已重建索引: {names}")
+
+    client.close()
+    print("恢复完成。")
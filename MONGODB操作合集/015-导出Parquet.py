@@ -0,0 +1,76 @@
+"""
+🌟 脚本名称：超导相关性质 Parquet 列式导出工具
+
+📌 功能概述：
+把 entry_id、composition 以及 structure.Superconductivity_related_properties 中的
+formation_energy / energy_above_hull / lambda_gamma / img_number / low_three 展平，
+以带类型的 Arrow RecordBatch 流式写入 Parquet 文件，供下游 notebook 直接 pd.read_parquet 秒级加载。
+
+📊 列定义（见 parquet_utils.py，006 --outputs parquet 使用同一套列定义）：
+- entry_id (string), entry_num (int64), original_structure (string)
+- composition：默认 map<string, int32>；使用 --wide-composition 时展开为每个元素一列（int32，缺失为 null）
+- formation_energy / energy_above_hull / lambda_gamma (float64), img_number (int32)
+- low_three：定长 3 的 float64 列表
+
+💾 读取示例：
+    import pandas as pd
+    df = pd.read_parquet("./export/superconductivity.parquet")
+
+📅 作者：张圳锐
+"""
+from pymongo import MongoClient
+import pyarrow.parquet as pq
+import argparse
+import json
+import os
+
+# 列定义与行转换在 parquet_utils.py 中，与 006 的 Parquet 输出共用
+from parquet_utils import PROJECTION, build_schema, list_elements, to_record_batch
+
+OUTPUT_PATH = './export/superconductivity.parquet'
+BATCH_SIZE = 10000
+
+
+def export_parquet(collection, output_path, query=None, wide_composition=False, batch_size=BATCH_SIZE):
+    """流式导出，内存中最多只保留一个批次，返回导出的行数"""
+    elements = list_elements(collection) if wide_composition else None
+    schema = build_schema(elements)
+
+    total = 0
+    docs = []
+    cursor = collection.find(query or {}, PROJECTION, batch_size=batch_size).sort("entry_num", 1)
+    with pq.ParquetWriter(output_path, schema, compression="zstd") as writer:
+        for doc in cursor:
+            docs.append(doc)
+            if len(docs) >= batch_size:
+                writer.write_batch(to_record_batch(docs, schema, elements))
+                total += len(docs)
+                docs = []
+                print(f"已写入 {total} 行...")
+        if docs:
+            writer.write_batch(to_record_batch(docs, schema, elements))
+            total += len(docs)
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="导出超导相关性质为 Parquet")
+    parser.add_argument("--output", default=OUTPUT_PATH, help="输出 Parquet 文件路径")
+    parser.add_argument("--wide-composition", action="store_true",
+                        help="composition 展开为每个元素一列（默认为 map 列）")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="每个 RecordBatch 的行数")
+    args = parser.parse_args()
+
+    # 读取配置文件
+    with open("config.json", "r") as f:
+        config = json.load(f)["mongodb"]
+
+    client = MongoClient(config["uri"])
+    collection = client[config["db_name"]][config["collection_name"]]
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    total = export_parquet(collection, args.output, wide_composition=args.wide_composition,
+                           batch_size=args.batch_size)
+    print(f"✅ 共导出 {total} 行到 {args.output}")
+
+    client.close()
@@ -0,0 +1,230 @@
+"""
+🌟 脚本名称：MongoDB 材料数据查询命令行工具
+
+📌 功能概述：
+用一条命令代替手工复制 003/006 再修改查询字典：
+- 过滤条件：composition、original-structure、任意超导相关性质字段
+- 投影下推到服务端，只传输需要的字段（默认不取 sites）
+- 支持排序、数量限制、索引 hint，输出为表格 / JSONL / CSV
+- --explain 打印执行计划统计（扫描文档数 vs 返回数、使用的索引），上线前先排查慢查询
+
+🚀 使用示例：
+    python 016-查询命令行工具.py --structure "ThB5(P4/mmm)" --where img_number=0 --where "formation_energy<0" \\
+        --fields entry_id,composition,lambda_gamma --sort lambda_gamma:desc --limit 20
+    python 016-查询命令行工具.py --composition B=5,Sr=1 --format jsonl
+    python 016-查询命令行工具.py --where "lambda_gamma>=0.5" --explain
+    python 016-查询命令行工具.py --sort=-lambda_gamma,entry_num   # 前缀 - 写法需用 "=" 连接，否则会被当成选项
+
+📝 字段名说明：
+不带 "." 的性质字段（formation_energy、energy_above_hull、lambda_gamma、img_number、low_three）
+自动映射到 structure.Superconductivity_related_properties 下；带 "." 的按完整路径使用。
+
+📅 作者：张圳锐
+"""
+from pymongo import MongoClient
+from bson import json_util
+from bson.json_util import RELAXED_JSON_OPTIONS
+import argparse
+import csv
+import json
+import re
+import sys
+
+PROPS_PATH = "structure.Superconductivity_related_properties"
+PROPS_FIELDS = {"formation_energy", "energy_above_hull", "lambda_gamma", "img_number", "low_three"}
+DEFAULT_FIELDS = ["entry_id", "composition", "original-structure",
+                  "formation_energy", "energy_above_hull", "lambda_gamma", "img_number"]
+
+# 注意顺序：先匹配两个字符的运算符
+WHERE_PATTERN = re.compile(r"^\s*([\w.\-]+)\s*(<=|>=|!=|=|<|>)\s*(.+?)\s*$")
+OPERATORS = {"=": "$eq", "!=": "$ne", "<": "$lt", "<=": "$lte", ">": "$gt", ">=": "$gte"}
+
+
+def field_path(name):
+    """把简写字段名映射为文档中的完整路径"""
+    if name in PROPS_FIELDS:
+        return f"{PROPS_PATH}.{name}"
+    return name
+
+
+def parse_value(text):
+    # 数字 / null / true / false / 列表按 JSON 解析，其它按字符串处理
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text.strip("'\"")
+
+
+def build_filter(composition=None, structure=None, where=()):
+    query = {}
+    if composition:
+        for item in composition.split(","):
+            element, count = item.split("=")
+            query[f"composition.{element.strip()}"] = int(count)
+    if structure:
+        query["original-structure"] = structure
+    for condition in where:
+        match = WHERE_PATTERN.match(condition)
+        if not match:
+            raise ValueError(f"无法解析的条件: {condition}（格式如 formation_energy<0）")
+        name, op, value = match.groups()
+        path = field_path(name)
+        if path in query and not isinstance(query[path], dict):
+            query[path] = {"$eq": query[path]}
+        query.setdefault(path, {})[OPERATORS[op]] = parse_value(value)
+    return query
+
+
+def build_projection(fields):
+    projection = {field_path(name): 1 for name in fields}
+    if "_id" not in fields:
+        projection["_id"] = 0
+    return projection
+
+
+def build_sort(sort):
+    if not sort:
+        return None
+    keys = []
+    for item in sort.split(","):
+        item = item.strip()
+        name, _, order = item.partition(":")
+        if order:
+            # 后缀写法：lambda_gamma:desc / entry_num:asc
+            if order.lower() not in ("asc", "desc"):
+                raise ValueError(f"无法识别的排序方向: {item}（可选 asc / desc）")
+            direction = -1 if order.lower() == "desc" else 1
+        else:
+            direction = -1 if name.startswith("-") else 1
+        keys.append((field_path(name.lstrip("+-")), direction))
+    return keys
+
+
+def get_path(doc, path):
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _walk_plan(plan, stages, indexes):
+    if not isinstance(plan, dict):
+        return
+    if "stage" in plan:
+        stages.append(plan["stage"])
+    if "indexName" in plan:
+        indexes.append(plan["indexName"])
+    for key in ("inputStage", "queryPlan", "outerStage", "innerStage"):
+        _walk_plan(plan.get(key), stages, indexes)
+    for child in plan.get("inputStages", []):
+        _walk_plan(child, stages, indexes)
+
+
+def explain(collection, query, projection, sort, limit, hint):
+    """用 executionStats 级别执行 explain，返回关键统计"""
+    command = {"find": collection.name, "filter": query, "projection": projection}
+    if sort:
+        command["sort"] = dict(sort)
+    if limit:
+        command["limit"] = limit
+    if hint:
+        command["hint"] = hint
+    result = collection.database.command("explain", command, verbosity="executionStats")
+    stats = result.get("executionStats", {})
+    stages, indexes = [], []
+    _walk_plan(result.get("queryPlanner", {}).get("winningPlan", {}), stages, indexes)
+    return {
+        "nReturned": stats.get("nReturned"),
+        "totalDocsExamined": stats.get("totalDocsExamined"),
+        "totalKeysExamined": stats.get("totalKeysExamined"),
+        "executionTimeMillis": stats.get("executionTimeMillis"),
+        "stages": stages,
+        "indexes": indexes,
+    }
+
+
+def print_explain(info):
+    print(f"返回文档数      nReturned:          {info['nReturned']}")
+    print(f"扫描文档数      totalDocsExamined:  {info['totalDocsExamined']}")
+    print(f"扫描索引键数    totalKeysExamined:  {info['totalKeysExamined']}")
+    print(f"执行耗时(ms)    executionTimeMillis: {info['executionTimeMillis']}")
+    print(f"执行计划阶段:   {' -> '.join(info['stages'])}")
+    print(f"使用的索引:     {', '.join(info['indexes']) if info['indexes'] else '无'}")
+    if "COLLSCAN" in info["stages"]:
+        print("⚠️ 存在全集合扫描（COLLSCAN），建议为过滤/排序字段建立索引")
+    elif info["nReturned"] and info["totalDocsExamined"] and info["totalDocsExamined"] > 10 * info["nReturned"]:
+        print("⚠️ 扫描文档数远大于返回数，索引选择性较差")
+
+
+def write_results(cursor, fields, fmt, out):
+    paths = [field_path(name) for name in fields]
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(out)
+        writer.writerow(fields)
+        for doc in cursor:
+            writer.writerow([json.dumps(v) if isinstance(v, (dict, list)) else v
+                             for v in (get_path(doc, p) for p in paths)])
+            count += 1
+    elif fmt == "jsonl":
+        for doc in cursor:
+            out.write(json_util.dumps(doc, json_options=RELAXED_JSON_OPTIONS, ensure_ascii=False) + "\n")
+            count += 1
+    else:
+        out.write("\t".join(fields) + "\n")
+        for doc in cursor:
+            out.write("\t".join(str(get_path(doc, p)) for p in paths) + "\n")
+            count += 1
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MongoDB 材料数据查询命令行工具")
+    parser.add_argument("--composition", help="化学组成，如 B=5,Sr=1")
+    parser.add_argument("--structure", help="original-structure，如 'ThB5(P4/mmm)'")
+    parser.add_argument("--where", action="append", default=[],
+                        help="性质条件，可重复，如 'formation_energy<0'、img_number=0")
+    parser.add_argument("--fields", default=",".join(DEFAULT_FIELDS), help="返回字段，逗号分隔")
+    parser.add_argument("--sort", help="排序字段，逗号分隔，后缀 :desc 表示降序，如 lambda_gamma:desc,entry_num；"
+                             "也可用前缀 -，但需写成 --sort=-lambda_gamma")
+    parser.add_argument("--limit", type=int, default=0, help="最多返回条数，0 表示不限")
+    parser.add_argument("--hint", help="强制使用的索引名")
+    parser.add_argument("--format", choices=["table", "jsonl", "csv"], default="table", help="输出格式")
+    parser.add_argument("--output", help="输出文件路径，默认输出到控制台")
+    parser.add_argument("--explain", action="store_true", help="只打印执行计划统计，不输出结果")
+    args = parser.parse_args()
+
+    # 读取配置文件
+    with open("config.json", "r") as f:
+        config = json.load(f)["mongodb"]
+
+    client = MongoClient(config["uri"])
+    collection = client[config["db_name"]][config["collection_name"]]
+
+    fields = [name.strip() for name in args.fields.split(",") if name.strip()]
+    query = build_filter(args.composition, args.structure, args.where)
+    projection = build_projection(fields)
+    sort = build_sort(args.sort)
+    print(f"查询条件: {json.dumps(query, ensure_ascii=False)}", file=sys.stderr)
+
+    if args.explain:
+        print_explain(explain(collection, query, projection, sort, args.limit, args.hint))
+        raise SystemExit(0)
+
+    cursor = collection.find(query, projection)
+    if sort:
+        cursor = cursor.sort(sort)
+    if args.limit:
+        cursor = cursor.limit(args.limit)
+    if args.hint:
+        cursor = cursor.hint(args.hint)
+
+    out = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    try:
+        count = write_results(cursor, fields, args.format, out)
+    finally:
+        if args.output:
+            out.close()
+    print(f"共 {count} 条记录", file=sys.stderr)
@@ -0,0 +1,158 @@
+"""
+🌟 脚本名称：磁盘 ID 文件夹与 MongoDB entry_id 一致性检查
+
+📌 功能概述：
+一次运行给出三类差异，替代 3.快速查找哪些没有ID + 手工比对：
+1. 工作目录（*-*，含 CONTCAR）下没有 ID-n 子目录：入库失败或尚未入库
+2. 孤立的 ID-n 文件夹：磁盘上存在，数据库中没有对应的 entry_id（如已被 005 删除）
+3. 数据库中的 entry_id 在磁盘上没有归档文件夹
+另外报告同一 entry_id 出现在多个位置的文件夹。
+
+⚡ 实现：
+- 数据库侧只投影 entry_id（--verify-hash 时加 structure_hash），大批量流式读取到集合中
+- 磁盘侧查询 对系统文件进行操作/fs_catalog.py 的目录索引（--refresh 先增量刷新），不遍历网络盘
+- --verify-hash：重新解析 ID-n/{化学式}.vasp 计算 structure_hash，与数据库中存储的指纹比对（线程池并发读取）
+
+🚀 使用示例：
+    python 017-磁盘与数据库一致性检查.py D:/.../7.fuwuqi/DATA --refresh
+    python 017-磁盘与数据库一致性检查.py D:/.../7.fuwuqi/DATA --verify-hash --output reconcile.json
+
+📅 作者：张圳锐
+"""
+from pymongo import MongoClient
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import os
+import sys
+import time
+
+from poscar_utils import parse_poscar
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "对系统文件进行操作"))
+from fs_catalog import (CATALOG_PATH, open_catalog, build_catalog, is_cataloged, find_id_dirs,
+                        find_unmatched_work_dirs)
+
+DEFAULT_CATALOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "对系统文件进行操作", CATALOG_PATH)
+READ_BATCH_SIZE = 10000
+# 控制台每类差异最多打印的条数（完整列表用 --output 导出）
+PRINT_LIMIT = 20
+
+
+def load_db_entries(collection, with_hash=False):
+    """返回 {entry_id: structure_hash 或 None}"""
+    projection = {"_id": 0, "entry_id": 1}
+    if with_hash:
+        projection["structure_hash"] = 1
+    cursor = collection.find({"entry_id": {"$exists": True}}, projection, batch_size=READ_BATCH_SIZE)
+    return {doc["entry_id"]: doc.get("structure_hash") for doc in cursor}
+
+
+def load_disk(conn, roots):
+    """返回 (id_dirs: {entry_id: [path, ...]}, 没有 ID 子目录的工作目录列表)"""
+    id_dirs = {}
+    work_without_id = []
+    for root in roots:
+        for path, entry_id in find_id_dirs(conn, root):
+            id_dirs.setdefault(entry_id, []).append(path)
+        work_without_id.extend(find_unmatched_work_dirs(conn, root))
+    return id_dirs, sorted(work_without_id)
+
+
+def vasp_structure_hash(path):
+    """解析 012 归档的 {化学式}.vasp，按入库时相同的规则（同一个解析器）计算 structure_hash"""
+    return parse_poscar(path).structure_hash()
+
+
+def _check_hash(entry_id, folder, expected):
+    vasp_files = [e.path for e in os.scandir(folder) if e.name.endswith(".vasp")]
+    if not vasp_files:
+        return entry_id, folder, "missing .vasp"
+    try:
+        actual = vasp_structure_hash(vasp_files[0])
+    except Exception as e:
+        return entry_id, folder, f"parse error: {type(e).__name__}: {e}"
+    if expected is None:
+        return entry_id, folder, "no structure_hash in db"
+    return entry_id, folder, None if actual == expected else f"hash mismatch: {actual} != {expected}"
+
+
+def reconcile(collection, conn, roots, verify_hash=False, workers=16):
+    db_entries = load_db_entries(collection, with_hash=verify_hash)
+    id_dirs, work_without_id = load_disk(conn, roots)
+
+    db_ids = set(db_entries)
+    disk_ids = set(id_dirs)
+    report = {
+        "work_dirs_without_id": work_without_id,
+        "orphan_id_dirs": sorted(path for entry_id in disk_ids - db_ids for path in id_dirs[entry_id]),
+        "db_entries_without_folder": sorted(db_ids - disk_ids, key=lambda e: (len(e), e)),
+        "duplicate_id_dirs": {entry_id: paths for entry_id, paths in id_dirs.items() if len(paths) > 1},
+    }
+    if verify_hash:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(lambda args: _check_hash(*args), [
+                (entry_id, path, db_entries[entry_id])
+                for entry_id in db_ids & disk_ids for path in id_dirs[entry_id]
+            ])
+            report["hash_problems"] = [
+                {"entry_id": entry_id, "path": path, "problem": problem}
+                for entry_id, path, problem in sorted(results) if problem
+            ]
+    report["summary"] = {
+        "db_entries": len(db_ids),
+        "disk_id_dirs": sum(len(paths) for paths in id_dirs.values()),
+        **{name: len(value) for name, value in report.items() if name != "summary"},
+    }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="磁盘 ID 文件夹与 MongoDB entry_id 一致性检查")
+    parser.add_argument("roots", nargs="+", help="数据根目录（与目录索引中的路径对应）")
+    parser.add_argument("--catalog", default=DEFAULT_CATALOG, help="目录索引 SQLite 文件")
+    parser.add_argument("--refresh", action="store_true", help="检查前先增量刷新目录索引")
+    parser.add_argument("--verify-hash", action="store_true", help="重新计算 .vasp 的结构指纹并与数据库比对")
+    parser.add_argument("--workers", type=int, default=16, help="--verify-hash 读取文件的线程数")
+    parser.add_argument("--output", default=None, help="把完整差异列表写入 JSON 文件")
+    args = parser.parse_args()
+
+    # 读取配置文件
+    with open("config.json", "r") as f:
+        config = json.load(f)["mongodb"]
+
+    client = MongoClient(config["uri"])
+    collection = client[config["db_name"]][config["collection_name"]]
+
+    start = time.perf_counter()
+    conn = open_catalog(args.catalog)
+    for root in args.roots:
+        # 尚未建立索引的根目录先扫描一次，否则查询会报错
+        if args.refresh or not is_cataloged(conn, root):
+            build_catalog(conn, root)
+
+    report = reconcile(collection, conn, args.roots, verify_hash=args.verify_hash, workers=args.workers)
+
+    titles = {
+        "work_dirs_without_id": "没有 ID 子目录的工作目录",
+        "orphan_id_dirs": "数据库中不存在的 ID 文件夹",
+        "db_entries_without_folder": "磁盘上没有文件夹的 entry_id",
+        "duplicate_id_dirs": "出现在多个位置的 ID 文件夹",
+        "hash_problems": "结构指纹不一致",
+    }
+    for name, title in titles.items():
+        if name not in report:
+            continue
+        items = report[name]
+        print(f"\n{'✅' if not items else '⚠️'} {title}：{len(items)}")
+        for item in list(items.items() if isinstance(items, dict) else items)[:PRINT_LIMIT]:
+            print(f"    {item}")
+        if len(items) > PRINT_LIMIT:
+            print(f"    ...（其余 {len(items) - PRINT_LIMIT} 条见 --output）")
+
+    print(f"\n数据库 {report['summary']['db_entries']} 条，磁盘 ID 文件夹 {report['summary']['disk_id_dirs']} 个，"
+          f"用时 {time.perf_counter() - start:.1f} 秒")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"完整报告已写入 {args.output}")
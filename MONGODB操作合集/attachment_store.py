@@ -0,0 +1,120 @@
+"""
+内容寻址的附件存储，供 012 归档 ID-n/ 文件夹使用。
+
+📌 说明：
+- 附件按内容的 sha256 保存为 blob（<store>/ab/cdef...），相同内容只保存一份，重复运行不再复制相同的字节
+- ID-n/ 下的文件优先以硬链接指向 blob；文件系统不支持（如跨盘）时尝试 reflink（Linux FICLONE），
+  最后退回普通复制
+- ParallelLinker 用线程池并发完成哈希与链接，与 CONTCAR 解析、数据库写入同时进行
+
+❗ 注意：硬链接与 blob 共享同一份数据，不要直接原地修改 ID-n/ 下的文件（先删除再写入新文件）。
+"""
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+import shutil
+import uuid
+
+READ_CHUNK = 1024 * 1024
+# Linux ioctl FICLONE（btrfs / xfs 等支持 reflink 的文件系统）
+FICLONE = 0x40049409
+
+
+def file_sha256(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(READ_CHUNK), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _reflink(src, dst):
+    import fcntl
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+
+
+class AttachmentStore:
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def blob_path(self, digest):
+        return os.path.join(self.root, digest[:2], digest[2:])
+
+    def put(self, src):
+        """把文件存入 store（已存在则跳过），返回 sha256"""
+        digest = file_sha256(src)
+        blob = self.blob_path(digest)
+        if not os.path.exists(blob):
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            tmp = f"{blob}.{uuid.uuid4().hex}.tmp"  # 多个线程可能同时写入同一 blob
+            shutil.copy2(src, tmp)
+            os.replace(tmp, blob)
+        return digest
+
+    def link(self, digest, target):
+        """让 target 指向 blob，返回使用的方式：existing / hardlink / reflink / copy"""
+        blob = self.blob_path(digest)
+        if os.path.exists(target) and os.path.samefile(blob, target):
+            return "existing"
+        os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+        tmp = f"{target}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.link(blob, tmp)
+            mode = "hardlink"
+        except OSError:
+            try:
+                _reflink(blob, tmp)
+                mode = "reflink"
+            except (OSError, ImportError):
+                shutil.copy2(blob, tmp)
+                mode = "copy"
+        os.replace(tmp, target)
+        return mode
+
+    def materialize(self, src, target):
+        return self.link(self.put(src), target)
+
+
+class ParallelLinker:
+    """
+    线程池中执行 store.materialize，drain() 等待所有已提交的任务完成
+
+    submit 可附带 key（如 012 的 CONTCAR 路径），drain() / close() 返回本轮有任务失败的 key 集合，
+    调用方据此让这些条目下次重新处理
+    """
+
+    def __init__(self, store, workers=8):
+        self.store = store
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.pending = []
+        self.stats = {"existing": 0, "hardlink": 0, "reflink": 0, "copy": 0, "missing": 0, "failed": 0}
+
+    def _materialize(self, src, target):
+        try:
+            return self.store.materialize(src, target)
+        except FileNotFoundError:
+            print(f"文件不存在，跳过: {src}")
+            return "missing"
+        except Exception as e:
+            print(f"复制文件时发生未知错误: {src} -> {str(e)}")
+            return "failed"
+
+    def submit(self, src, target, key=None):
+        self.pending.append((key, self.executor.submit(self._materialize, src, target)))
+
+    def drain(self):
+        failed = set()
+        for key, future in self.pending:
+            mode = future.result()
+            self.stats[mode] += 1
+            if mode == "failed" and key is not None:
+                failed.add(key)
+        self.pending = []
+        return failed
+
+    def close(self):
+        failed = self.drain()
+        self.executor.shutdown()
+        return failed
@@ -0,0 +1,225 @@
+"""
+前端展示用的物化集合（frontend view），供 007 与 012 共同使用。
+
+📌 说明：
+- 网站页面只需要 name / role / lambda_gamma 等少量字段，原始文档中的 sites 数组很大，
+  因此预先把 transform_document 的结果写入单独的集合，页面加载只做一次带索引的读取。
+- 增量维护：012 入库、005 删除/恢复时按受影响的文档刷新；全量重建：007 --rebuild。
+  重建期间的增量刷新写入的是旧集合，重建结束前会按 modified_at 补写期间变化的文档、删除期间被删的文档，
+  入库任务可以继续运行。
+- 集合名取 config.json 中的 frontend_collection，未配置时为 "<collection_name>_frontend"。
+- 前端文档只保存附件的 OSS 对象 key（image_key / omega_key / posfile_key），与 012 归档的
+  ID-n/ 目录结构一致；签名 URL 有有效期，在页面读取时用 阿里云操作合集/oss_utils.py 的
+  SignedUrlCache.sign_many 批量签名，写入 image / omega / posfile 字段。
+"""
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ReplaceOne
+
+PROPS_PATH = "structure.Superconductivity_related_properties"
+BATCH_SIZE = 1000
+# 重建补写时把起始时间提前该值，容忍入库机器与本机的时钟偏差
+CATCHUP_MARGIN = timedelta(minutes=5)
+
+# 从原始集合读取时只取构建前端文档所需的字段，不传输 sites
+SOURCE_PROJECTION = {
+    "entry_id": 1,
+    "entry_num": 1,
+    "composition": 1,
+    "chemsys": 1,
+    f"{PROPS_PATH}.lambda_gamma": 1,
+    f"{PROPS_PATH}.energy_above_hull": 1,
+    "structure_file": 1,
+}
+
+# 附件在 OSS 中的 key：与 012 归档的目录结构一致（{entry_id}/gamma-figsum.png）；
+# 结构文件名（{化学式}.vasp）由 012 写入原始文档的 structure_file 字段
+IMAGE_KEY_TEMPLATE = "{entry_id}/gamma-figsum.png"
+OMEGA_KEY_TEMPLATE = "{entry_id}/omega.dat"
+POSFILE_KEY_TEMPLATE = "{entry_id}/{structure_file}"
+
+# 附件 key 字段 -> 签名后写入的 URL 字段
+SIGNED_FIELDS = {"image_key": "image", "omega_key": "omega", "posfile_key": "posfile"}
+
+# 页面读取时返回的字段
+PAGE_PROJECTION = {
+    "id": 1, "name": 1, "role": 1,
+    "lambda_gamma": 1, "energy_relative_to_convex_hull": 1,
+    "image_key": 1, "omega_key": 1, "posfile_key": 1,
+}
+
+
+def view_collection(db, config):
+    return db[config.get("frontend_collection", config["collection_name"] + "_frontend")]
+
+
+def transform_document(document):
+    doc_id = document.get("_id", "")
+
+    composition = document.get("composition", {})
+    # 修改这一行来处理当数量为1时不显示数字的情况
+    name = "".join(f"{key}{value}" if value != 1 else f"{key}" for key, value in composition.items())
+    role = name
+
+    elements = list(composition.keys())
+    if len(elements) == 3:
+        if elements[1] == "B":
+            # 处理 B 元素的情况
+            elements = [elements[0], elements[2], elements[1]]
+            role = "".join(
+                f"{key}{composition[key]}" if composition[key] != 1 else key
+                for key in elements
+            ).replace(elements[0], "M", 1).replace(elements[1], "N", 1)
+
+        else:
+            role = name.replace(elements[0], "M", 1).replace(elements[1], "N", 1)
+
+    elif len(elements) == 2:
+        # Only one element exists, replace it with M
+        role = name.replace(elements[0], "M", 1)
+
+    # 入库时超导相关性质存放在 structure 下（而不是文档顶层）
+    props = (document.get("structure") or {}).get("Superconductivity_related_properties") or {}
+
+    return {
+        "id": doc_id,
+        "name": name,
+        "role": role,
+        "lambda_gamma": props.get("lambda_gamma"),
+        "energy_relative_to_convex_hull": props.get("energy_above_hull"),
+    }
+
+
+def build_view_doc(document):
+    """前端集合中的文档：_id 与原始文档相同，额外保留排序 / 筛选用的字段"""
+    view_doc = transform_document(document)
+    view_doc["_id"] = document["_id"]
+    view_doc["entry_id"] = document.get("entry_id")
+    view_doc["entry_num"] = document.get("entry_num")
+    view_doc["chemsys"] = document.get("chemsys")
+    entry_id = document.get("entry_id")
+    structure_file = document.get("structure_file")
+    view_doc["image_key"] = IMAGE_KEY_TEMPLATE.format(entry_id=entry_id) if entry_id else None
+    view_doc["omega_key"] = OMEGA_KEY_TEMPLATE.format(entry_id=entry_id) if entry_id else None
+    view_doc["posfile_key"] = (POSFILE_KEY_TEMPLATE.format(entry_id=entry_id, structure_file=structure_file)
+                               if entry_id and structure_file else None)
+    view_doc["updated_at"] = datetime.now(timezone.utc)
+    return view_doc
+
+
+def ensure_view_indexes(view):
+    view.create_index("entry_num")
+    view.create_index("chemsys")
+    view.create_index("lambda_gamma")
+
+
+def _write_view(view, docs, batch_size=BATCH_SIZE):
+    written = 0
+    ops = []
+    for doc in docs:
+        ops.append(ReplaceOne({"_id": doc["_id"]}, build_view_doc(doc), upsert=True))
+        if len(ops) >= batch_size:
+            view.bulk_write(ops, ordered=False)
+            written += len(ops)
+            ops = []
+    if ops:
+        view.bulk_write(ops, ordered=False)
+        written += len(ops)
+    return written
+
+
+def refresh_view(collection, view, query, batch_size=BATCH_SIZE):
+    """增量刷新：重新构建原始集合中匹配 query 的文档，返回刷新条数"""
+    cursor = collection.find(query, SOURCE_PROJECTION, batch_size=batch_size)
+    return _write_view(view, cursor, batch_size)
+
+
+class ViewRefresher:
+    """
+    逐条写入时累积受影响文档的 structure_hash，凑满一批后与批量模式一样用一次 $in 查询刷新，
+    避免每写入一个文件就查询 / 写入一次前端集合
+    """
+
+    def __init__(self, collection, view, batch_size=BATCH_SIZE):
+        self.collection = collection
+        self.view = view
+        self.batch_size = batch_size
+        self.pending = []
+
+    def add(self, structure_hash):
+        self.pending.append(structure_hash)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return 0
+        hashes, self.pending = self.pending, []
+        return refresh_view(self.collection, self.view, {"structure_hash": {"$in": hashes}}, self.batch_size)
+
+
+def remove_from_view(view, ids):
+    """原始文档被删除（或移入归档）后，同步删除前端文档"""
+    if not ids:
+        return 0
+    return view.delete_many({"_id": {"$in": list(ids)}}).deleted_count
+
+
+def _drop_deleted(collection, tmp, batch_size=BATCH_SIZE):
+    """删除临时集合中原始集合已不存在的文档（重建期间被 005 删除的），返回删除条数"""
+    removed = 0
+    ids = []
+    for doc in tmp.find({}, {"_id": 1}).sort("_id", 1):
+        ids.append(doc["_id"])
+        if len(ids) >= batch_size:
+            removed += _drop_missing(collection, tmp, ids)
+            ids = []
+    if ids:
+        removed += _drop_missing(collection, tmp, ids)
+    return removed
+
+
+def _drop_missing(collection, tmp, ids):
+    existing = {doc["_id"] for doc in collection.find({"_id": {"$in": ids}}, {"_id": 1})}
+    return remove_from_view(tmp, [i for i in ids if i not in existing])
+
+
+def rebuild_view(collection, view, batch_size=BATCH_SIZE):
+    """
+    全量重建：先写入临时集合，再原子替换，重建期间页面仍读取旧集合
+
+    重建期间 012 / 005 的增量刷新只写入旧集合，替换前补写 modified_at 不早于重建开始时间的文档，
+    并删除期间被删除的文档；补写之后到替换之间的极短窗口内的变化仍可能丢失，可再运行一次重建。
+    """
+    started = datetime.now(timezone.utc) - CATCHUP_MARGIN
+    tmp = view.database[view.name + "_rebuild"]
+    tmp.drop()
+    refresh_view(collection, tmp, {}, batch_size)
+    ensure_view_indexes(tmp)
+    refresh_view(collection, tmp, {"modified_at": {"$gte": started}}, batch_size)
+    _drop_deleted(collection, tmp, batch_size)
+    written = tmp.count_documents({})
+    if written:
+        tmp.rename(view.name, dropTarget=True)
+    else:
+        view.delete_many({})
+    return written
+
+
+def sign_page(items, signer):
+    """对一页数据的附件 key 一次性批量签名，写入 image / omega / posfile 字段"""
+    keys = [item[name] for item in items for name in SIGNED_FIELDS if item.get(name)]
+    urls = signer.sign_many(keys)
+    for item in items:
+        for key_field, url_field in SIGNED_FIELDS.items():
+            if item.get(key_field):
+                item[url_field] = urls[item[key_field]]
+    return items
+
+
+def get_page(view, skip=0, limit=20, sort=("entry_num", 1), signer=None):
+    """页面读取：单次带索引的查询；传入 signer（SignedUrlCache）时附带签名 URL"""
+    items = list(view.find({}, PAGE_PROJECTION).sort(*sort).skip(skip).limit(limit))
+    if signer is not None:
+        sign_page(items, signer)
+    return items
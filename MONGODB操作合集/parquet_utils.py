@@ -0,0 +1,89 @@
+"""
+超导相关性质的 Arrow 列定义与行转换，供 015（Parquet 导出）与 006（--outputs parquet）共同使用，
+两处导出的列名、类型保持一致。
+
+📊 列定义：
+- entry_id (string), entry_num (int64), original_structure (string)
+- composition：默认 map<string, int32>；传入 elements 时展开为每个元素一列（int32，缺失为 null）
+- formation_energy / energy_above_hull / lambda_gamma (float64), img_number (int32)
+- low_three：定长 3 的 float64 列表
+"""
+import pyarrow as pa
+
+PROPS_PATH = "structure.Superconductivity_related_properties"
+
+# 只取需要的字段，不传输 sites 等大字段
+PROJECTION = {
+    "_id": 0,
+    "entry_id": 1,
+    "entry_num": 1,
+    "original-structure": 1,
+    "composition": 1,
+    f"{PROPS_PATH}.formation_energy": 1,
+    f"{PROPS_PATH}.energy_above_hull": 1,
+    f"{PROPS_PATH}.lambda_gamma": 1,
+    f"{PROPS_PATH}.img_number": 1,
+    f"{PROPS_PATH}.low_three": 1,
+}
+
+FLOAT_PROPS = ["formation_energy", "energy_above_hull", "lambda_gamma"]
+
+
+def build_schema(elements=None):
+    """elements 为 None 时 composition 用 map 列，否则每个元素一列"""
+    fields = [
+        pa.field("entry_id", pa.string()),
+        pa.field("entry_num", pa.int64()),
+        pa.field("original_structure", pa.string()),
+    ]
+    if elements is None:
+        fields.append(pa.field("composition", pa.map_(pa.string(), pa.int32())))
+    else:
+        fields.extend(pa.field(el, pa.int32()) for el in elements)
+    fields.extend(pa.field(name, pa.float64()) for name in FLOAT_PROPS)
+    fields.append(pa.field("img_number", pa.int32()))
+    fields.append(pa.field("low_three", pa.list_(pa.float64(), 3)))
+    return pa.schema(fields)
+
+
+def list_elements(collection):
+    """服务端汇总所有出现过的元素（只返回元素列表，不传输文档）"""
+    pipeline = [
+        {"$project": {"_id": 0, "kv": {"$objectToArray": "$composition"}}},
+        {"$unwind": "$kv"},
+        {"$group": {"_id": "$kv.k"}},
+        {"$sort": {"_id": 1}},
+    ]
+    return [doc["_id"] for doc in collection.aggregate(pipeline, allowDiskUse=True)]
+
+
+def low_three_value(value):
+    if isinstance(value, (list, tuple)) and len(value) == 3:
+        return [float(x) for x in value]
+    return None
+
+
+def to_record_batch(docs, schema, elements=None):
+    columns = {name: [] for name in schema.names}
+    for doc in docs:
+        props = doc.get("structure", {}).get("Superconductivity_related_properties", {}) or {}
+        composition = doc.get("composition", {}) or {}
+        columns["entry_id"].append(doc.get("entry_id"))
+        columns["entry_num"].append(doc.get("entry_num"))
+        columns["original_structure"].append(doc.get("original-structure"))
+        if elements is None:
+            columns["composition"].append([(el, int(n)) for el, n in composition.items()])
+        else:
+            for el in elements:
+                n = composition.get(el)
+                columns[el].append(None if n is None else int(n))
+        for name in FLOAT_PROPS:
+            value = props.get(name)
+            columns[name].append(None if value is None else float(value))
+        img_number = props.get("img_number")
+        columns["img_number"].append(None if img_number is None else int(img_number))
+        columns["low_three"].append(low_three_value(props.get("low_three")))
+    return pa.RecordBatch.from_arrays(
+        [pa.array(columns[field.name], type=field.type) for field in schema],
+        schema=schema,
+    )
@@ -0,0 +1,166 @@
+"""
+POSCAR / CONTCAR 解析的公共工具，供 010（按结构查 ID）、012（入库）和 017（一致性检查）共同使用。
+
+📌 说明：
+- 坐标块一次性读入 NumPy (n, 3) 数组，元素以 species 下标数组表示，不逐原子构建字典
+- 支持缩放系数（单个值、负值表示目标体积、三个值分别缩放三个晶轴）、Direct / Cartesian 坐标、
+  Selective dynamics；Cartesian 坐标统一转换为分数坐标
+- 支持 VASP 5 格式（第 6 行为元素符号）；VASP 4 格式从第 1 行注释中读取元素符号
+- Poscar.sites 在首次访问时才转换为 MongoDB 入库格式（[{species, abc, label}, ...]）
+- parse_many 在进程池中批量解析整个目录树
+"""
+from concurrent.futures import ProcessPoolExecutor
+import os
+import re
+
+import numpy as np
+
+from structure_utils import structure_hash
+
+POSCAR_NAMES = ("POSCAR", "CONTCAR")
+ELEMENT_PATTERN = re.compile(r"^[A-Z][a-z]?$")
+
+
+class Poscar:
+    """
+    解析后的结构
+
+    属性:
+        comment: 第 1 行注释
+        lattice: (3, 3) 晶格矩阵（已乘缩放系数，单位 Å）
+        elements: 元素符号列表（按文件中的顺序）
+        counts: 每种元素的原子数
+        species: (n,) 每个原子对应的 elements 下标
+        frac_coords: (n, 3) 分数坐标
+        selective: (n, 3) 布尔数组（Selective dynamics 的 T/F），没有时为 None
+    """
+
+    def __init__(self, comment, lattice, elements, counts, frac_coords, selective=None):
+        self.comment = comment
+        self.lattice = lattice
+        self.elements = elements
+        self.counts = counts
+        self.species = np.repeat(np.arange(len(elements)), counts)
+        self.frac_coords = frac_coords
+        self.selective = selective
+        self._sites = None
+
+    @property
+    def labels(self):
+        """(n,) 每个原子的元素符号"""
+        return np.asarray(self.elements)[self.species]
+
+    @property
+    def composition(self):
+        composition = {}
+        for element, count in zip(self.elements, self.counts):
+            composition[element] = composition.get(element, 0) + int(count)
+        return composition
+
+    @property
+    def sites(self):
+        """MongoDB 入库格式的原子位点列表（首次访问时生成并缓存）"""
+        if self._sites is None:
+            self._sites = [
+                {"species": [{"element": label, "occu": 1}], "abc": abc, "label": label}
+                for label, abc in zip(self.labels.tolist(), self.frac_coords.tolist())
+            ]
+        return self._sites
+
+    def structure_hash(self):
+        return structure_hash(self.composition, self.lattice.tolist(), self.sites)
+
+    def to_structure(self):
+        """012 入库文档中 structure 的 lattice / sites 部分"""
+        return {"lattice": {"matrix": self.lattice.tolist()}, "sites": self.sites}
+
+
+def _read_floats(block, n_cols=3):
+    """把若干行的前 n_cols 列读成 (len(block), n_cols) 数组；每行恰好 n_cols 列时整体转换"""
+    tokens = " ".join(block).split()
+    if len(tokens) == n_cols * len(block):
+        return np.array(tokens, dtype=float).reshape(len(block), n_cols)
+    return np.array([line.split()[:n_cols] for line in block], dtype=float)
+
+
+def parse_poscar_text(text):
+    # 与 010 的旧实现一致，忽略空行
+    lines = [line for line in text.splitlines() if line.strip()]
+    comment = lines[0].strip()
+
+    scale = np.array(lines[1].split()[:3], dtype=float)
+    lattice = _read_floats(lines[2:5])
+    if scale.size == 3:
+        # 三个值分别缩放笛卡尔 x / y / z 分量
+        factor = scale
+    elif scale[0] < 0:
+        # 负值表示目标晶胞体积
+        factor = (-scale[0] / abs(np.linalg.det(lattice))) ** (1 / 3)
+    else:
+        factor = scale[0]
+    lattice = lattice * factor
+
+    index = 5
+    tokens = lines[index].split()
+    if all(ELEMENT_PATTERN.match(t) for t in tokens):
+        elements = tokens
+        index += 1
+        counts = np.array(lines[index].split(), dtype=int)
+    else:
+        # VASP 4：没有元素行，元素符号取自注释行
+        counts = np.array(tokens, dtype=int)
+        elements = re.findall(r"[A-Z][a-z]?", comment)[:len(counts)]
+        if len(elements) != len(counts):
+            raise ValueError("VASP 4 格式的 POSCAR 需要在第 1 行注释中给出元素符号")
+    index += 1
+
+    selective_dynamics = lines[index].strip()[:1] in ("S", "s")
+    if selective_dynamics:
+        index += 1
+    cartesian = lines[index].strip()[:1] in ("C", "c", "K", "k")
+    index += 1
+
+    n_atoms = int(counts.sum())
+    block = lines[index:index + n_atoms]
+    if len(block) != n_atoms:
+        raise ValueError(f"坐标行数不足：需要 {n_atoms} 行，实际 {len(block)} 行")
+    coords = _read_floats(block)
+
+    if cartesian:
+        # Cartesian 坐标同样要乘缩放系数，再转换为分数坐标：cart = frac @ lattice
+        coords = np.linalg.solve(lattice.T, (coords * factor).T).T
+
+    selective = None
+    if selective_dynamics:
+        flags = np.array([line.split()[3:6] for line in block])
+        selective = np.char.upper(flags) == "T"
+
+    return Poscar(comment, lattice, elements, counts, coords, selective)
+
+
+def parse_poscar(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return parse_poscar_text(f.read())
+
+
+def find_poscar_files(root):
+    """递归查找目录下的 POSCAR / CONTCAR / *.vasp 文件"""
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        for name in filenames:
+            if name in POSCAR_NAMES or name.endswith(".vasp"):
+                paths.append(os.path.join(dirpath, name))
+    return sorted(paths)
+
+
+def _parse_safe(path):
+    try:
+        return path, parse_poscar(path), None
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}"
+
+
+def parse_many(paths, workers=None, chunksize=16):
+    """在进程池中批量解析，按输入顺序产出 (path, Poscar 或 None, 错误信息或 None)"""
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(_parse_safe, paths, chunksize=chunksize)
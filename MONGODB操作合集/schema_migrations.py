@@ -0,0 +1,151 @@
+"""
+有版本号、可断点续跑的 schema 迁移，001 为命令行入口。
+
+📌 说明：
+- MIGRATIONS 按版本号顺序列出所有迁移步骤；新的键名修改请追加到末尾，不要修改已发布的步骤
+- 只有被某个迁移步骤修改的文档才写入 schema_version（最后一次修改它的版本），不匹配迁移条件的文档
+  不会被改写；集合整体进度以 schema_migrations 集合（config.json 中的 migrations_collection）中的
+  状态为准：{_id: 集合名, schema_version, checkpoint, history}
+- 每个步骤按 _id 区间分批执行（走 _id 索引），批次之间可暂停限速，写入使用 majority 写关注，
+  每批完成后在状态文档中记录检查点，中断后从检查点继续，可在线上库运行
+- 012 新入库的文档直接写入 LATEST_SCHEMA_VERSION
+- 被修改的文档同时写入 modified_at（服务端当前时间），011 增量备份据此导出迁移后的新版本
+"""
+from datetime import datetime, timezone
+import time
+
+from pymongo.write_concern import WriteConcern
+
+BATCH_SIZE = 1000
+# 每批之间暂停的秒数（限速，减轻主节点压力）
+BATCH_PAUSE = 0.05
+
+PROPS_PATH = "structure.Superconductivity_related_properties"
+
+
+class Migration:
+    """
+    单个迁移步骤
+
+    参数:
+        version: 版本号（从 1 开始递增）
+        description: 说明
+        filter: 需要修改的文档条件
+        update: 更新文档（如 {"$rename": ...}）或聚合管道更新（列表）
+    """
+
+    def __init__(self, version, description, filter, update):
+        self.version = version
+        self.description = description
+        self.filter = filter
+        self.update = update
+
+    def versioned_update(self):
+        """在更新中附带写入 schema_version 与修改时间 modified_at"""
+        if isinstance(self.update, list):
+            return self.update + [{"$set": {"schema_version": self.version, "modified_at": "$$NOW"}}]
+        update = dict(self.update)
+        update["$set"] = dict(update.get("$set", {}), schema_version=self.version)
+        update["$currentDate"] = dict(update.get("$currentDate", {}), modified_at=True)
+        return update
+
+
+MIGRATIONS = [
+    Migration(
+        1, "datatime 字符串转为 BSON 日期（011 增量备份依赖）",
+        {"datatime": {"$type": "string"}},
+        [{"$set": {"datatime": {"$dateFromString": {
+            "dateString": "$datatime",
+            "format": "%Y-%m-%dT%H:%M%z"
+        }}}}],
+    ),
+    Migration(
+        2, "Energy_above_hull 键名改为 energy_above_hull",
+        {f"{PROPS_PATH}.Energy_above_hull": {"$exists": True}},
+        {"$rename": {f"{PROPS_PATH}.Energy_above_hull": f"{PROPS_PATH}.energy_above_hull"}},
+    ),
+]
+
+LATEST_SCHEMA_VERSION = MIGRATIONS[-1].version
+
+
+def state_collection(db, config):
+    return db[config.get("migrations_collection", "schema_migrations")]
+
+
+def get_state(state, collection):
+    return state.find_one({"_id": collection.name}) or {"_id": collection.name, "schema_version": 0}
+
+
+def pending_migrations(state, collection, migrations=MIGRATIONS):
+    current = get_state(state, collection)["schema_version"]
+    return [m for m in migrations if m.version > current]
+
+
+def _outdated(version):
+    return {"$or": [{"schema_version": {"$lt": version}}, {"schema_version": {"$exists": False}}]}
+
+
+def _next_boundary(collection, last_id, batch_size):
+    """返回本批最后一个文档的 _id（只读 _id 索引），之后不足一批时返回 None"""
+    query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+    doc = next(collection.find(query, {"_id": 1}).sort("_id", 1).skip(batch_size - 1).limit(1), None)
+    return doc["_id"] if doc else None
+
+
+def run_migration(collection, state, migration, batch_size=BATCH_SIZE, pause=BATCH_PAUSE):
+    """按 _id 区间分批执行一个迁移步骤，返回修改的文档数"""
+    collection = collection.with_options(write_concern=WriteConcern(w="majority"))
+    checkpoint = get_state(state, collection).get("checkpoint") or {}
+    if checkpoint.get("version") == migration.version:
+        last_id = checkpoint.get("last_id")
+        modified = checkpoint.get("modified", 0)
+        print(f"  从检查点继续：_id > {last_id}，已修改 {modified} 条")
+    else:
+        last_id, modified = None, 0
+
+    while True:
+        boundary = _next_boundary(collection, last_id, batch_size)
+        id_range = {}
+        if last_id is not None:
+            id_range["$gt"] = last_id
+        if boundary is not None:
+            id_range["$lte"] = boundary
+        query = {"$and": ([{"_id": id_range}] if id_range else [])
+                          + [_outdated(migration.version), migration.filter]}
+
+        # 只更新匹配迁移条件的文档（同时写入版本号），其余文档保持不动
+        modified += collection.update_many(query, migration.versioned_update()).modified_count
+        if boundary is None:
+            break
+
+        last_id = boundary
+        state.update_one(
+            {"_id": collection.name},
+            {"$set": {"checkpoint": {"version": migration.version, "last_id": last_id, "modified": modified}}},
+            upsert=True,
+        )
+        if pause:
+            time.sleep(pause)
+
+    state.update_one(
+        {"_id": collection.name},
+        {
+            "$set": {"schema_version": migration.version},
+            "$unset": {"checkpoint": ""},
+            "$push": {"history": {"version": migration.version, "description": migration.description,
+                                  "modified": modified, "finished_at": datetime.now(timezone.utc)}},
+        },
+        upsert=True,
+    )
+    return modified
+
+
+def migrate(collection, state, target=None, batch_size=BATCH_SIZE, pause=BATCH_PAUSE):
+    """依次执行所有未完成的迁移（直到 target 版本）"""
+    for migration in pending_migrations(state, collection):
+        if target is not None and migration.version > target:
+            break
+        print(f"▶ 迁移 v{migration.version}: {migration.description}")
+        modified = run_migration(collection, state, migration, batch_size, pause)
+        print(f"✅ v{migration.version} 完成：修改 {modified} 条")
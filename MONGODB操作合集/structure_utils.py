@@ -0,0 +1,119 @@
+"""
+晶体结构相关的公共工具函数，供 MONGODB操作合集 下的各脚本共同使用。
+
+📌 当前包含：
+- structure_hash：根据 composition + lattice + sites 计算规范化结构指纹，
+  用于入库去重（012）以及对已有文档的回填。
+- entry_num_from_id：从 "ID-123" 形式的 entry_id 提取数值，写入 entry_num 字段供索引使用。
+- chemsys_fields / chemsys_filter：生成 elements / nelements / chemsys 派生字段，以及基于这些字段
+  （可走索引）的化学体系查询条件，替代对 composition 动态键的 $exists 查询。
+"""
+from itertools import combinations
+import hashlib
+import json
+
+# subset 查询会枚举所有非空子集的 chemsys，元素数超过该值时改用不走索引的 $elemMatch 条件
+MAX_SUBSET_ELEMENTS = 12
+
+# 指纹计算时的保留精度（小数位数）
+LATTICE_DECIMALS = 5
+COORD_DECIMALS = 5
+
+
+def _quantize(value, decimals):
+    """把浮点数按给定小数位数量化为整数，避免浮点表示差异（如 -0.0 与 0.0）影响指纹"""
+    return int(round(float(value) * 10 ** decimals))
+
+
+def structure_hash(composition, lattice_matrix, sites,
+                   lattice_decimals=LATTICE_DECIMALS, coord_decimals=COORD_DECIMALS):
+    """
+    计算规范化的结构指纹
+
+    规范化规则：
+    - composition 按元素符号排序
+    - 晶格矩阵按 lattice_decimals 位小数量化
+    - 分数坐标按 coord_decimals 位小数量化并做周期性折回（1.0 与 0.0 视为相同），
+      然后按 (元素, 坐标) 排序，使结果与原子顺序无关
+
+    参数:
+        composition: 化学组成字典，如 {'B': 5, 'Sr': 1}
+        lattice_matrix: 3x3 晶格矩阵
+        sites: 原子位点列表，每个元素包含 'label' 和 'abc'
+
+    返回:
+        40 位十六进制字符串（sha1）
+    """
+    period = 10 ** coord_decimals
+    canonical = {
+        "composition": sorted([str(el), int(n)] for el, n in composition.items()),
+        "lattice": [[_quantize(x, lattice_decimals) for x in row] for row in lattice_matrix],
+        "sites": sorted(
+            [site["label"]] + [_quantize(x, coord_decimals) % period for x in site["abc"][:3]]
+            for site in sites
+        ),
+    }
+    payload = json.dumps(canonical, separators=(",", ":"), sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def document_structure_hash(doc):
+    """从数据库文档（012 入库格式）计算结构指纹，缺少结构信息时返回 None"""
+    structure = doc.get("structure") or {}
+    lattice = (structure.get("lattice") or {}).get("matrix")
+    sites = structure.get("sites")
+    if not lattice or not sites:
+        return None
+    return structure_hash(doc.get("composition") or {}, lattice, sites)
+
+
+def entry_num_from_id(entry_id):
+    """从 'ID-123' 提取整数 123，格式不符时返回 None"""
+    if not isinstance(entry_id, str) or "-" not in entry_id:
+        return None
+    try:
+        return int(entry_id.rsplit("-", 1)[1])
+    except ValueError:
+        return None
+
+
+def chemsys_fields(elements):
+    """
+    由元素集合生成化学体系派生字段
+
+    参数:
+        elements: 元素符号的可迭代对象（也可以直接传 composition 字典）
+
+    返回:
+        {"elements": ["B", "Sc", "Ti"], "nelements": 3, "chemsys": "B-Sc-Ti"}
+    """
+    symbols = sorted(set(str(el) for el in elements))
+    return {"elements": symbols, "nelements": len(symbols), "chemsys": "-".join(symbols)}
+
+
+def chemsys_filter(elements, mode="all"):
+    """
+    构建化学体系查询条件
+
+    mode:
+        all     包含所有给定元素（可含其它元素），走 elements 多键索引
+        exact   恰好由这些元素组成，走 chemsys 索引
+        subset  只由给定元素的子集组成（如 B-Sc-Ti 下的 B、Sc-B、B-Sc-Ti 等），
+                枚举所有子集后用 chemsys $in 走索引
+    """
+    symbols = chemsys_fields(elements)["elements"]
+    if not symbols:
+        raise ValueError("至少需要一个元素")
+    if mode == "all":
+        return {"elements": {"$all": symbols}}
+    if mode == "exact":
+        return {"chemsys": "-".join(symbols)}
+    if mode == "subset":
+        if len(symbols) > MAX_SUBSET_ELEMENTS:
+            return {"elements": {"$exists": True, "$not": {"$elemMatch": {"$nin": symbols}}}}
+        return {"chemsys": {"$in": [
+            "-".join(combo)
+            for n in range(1, len(symbols) + 1)
+            for combo in combinations(symbols, n)
+        ]}}
+    raise ValueError(f"未知的查询模式: {mode}（可选 all / exact / subset）")
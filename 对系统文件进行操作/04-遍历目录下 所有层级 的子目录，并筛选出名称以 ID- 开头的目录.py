@@ -1,17 +1,26 @@
+import argparse
 import os
 
+from fs_catalog import CATALOG_PATH, open_catalog, build_catalog, is_cataloged, find_id_dirs
+
 # 目标目录路径
 target_dir = r"D:\School\SophomoreStudyMaterials\00MachineLearning\7.fuwuqi\DATA\origin-ThB5-all\B-221\03-origin-ThB5_13_24_221"
 
-# 递归查找所有 ID-* 目录
-id_dirs = []
-for root, dirs, files in os.walk(target_dir):
-    for dir_name in dirs:
-        if dir_name.startswith("ID-"):
-            full_path = os.path.join(root, dir_name)
-            id_dirs.append(full_path)
+# 查询目录索引（先用 05-构建目录索引.py 建立；尚未建立时自动扫描），不再两次 os.walk 遍历整棵目录树
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="列出目录下所有层级的 ID-* 目录")
+    parser.add_argument("target_dir", nargs="?", default=target_dir)
+    parser.add_argument("--catalog", default=CATALOG_PATH, help="索引 SQLite 文件路径")
+    parser.add_argument("--refresh", action="store_true", help="查询前先增量刷新索引")
+    args = parser.parse_args()
+
+    conn = open_catalog(args.catalog)
+    if args.refresh or not is_cataloged(conn, args.target_dir):
+        build_catalog(conn, args.target_dir)
+
+    # 所有 ID-* 目录（按编号排序）
+    id_dirs = [path for path, entry_id in find_id_dirs(conn, args.target_dir)]
 
-# 输出结果
-id_dirs_names = [dir_name for root, dirs, files in os.walk(target_dir)
-                for dir_name in dirs if dir_name.startswith("ID-")]
-print(id_dirs_names)
\ No newline at end of file
+    # 输出结果
+    id_dirs_names = [os.path.basename(path) for path in id_dirs]
+    print(id_dirs_names)
@@ -0,0 +1,39 @@
+"""
+🌟 脚本名称：构建 / 刷新工作目录索引
+
+📌 功能概述：
+并行 os.scandir 遍历一次目录树，把工作目录、ID-n 目录及附件信息写入 fs_catalog.sqlite（见 fs_catalog.py），
+之后 04 / 2 / 3 等脚本直接查询索引，不再每次遍历网络共享盘。
+再次运行时只重新列出 mtime 发生变化的目录（增量刷新）。
+
+🚀 使用示例：
+    python 05-构建目录索引.py D:/.../7.fuwuqi/DATA D:/.../7.fuwuqi/work_100-199
+    python 05-构建目录索引.py D:/.../7.fuwuqi/DATA --full      # 全量重建
+
+📅 作者：张圳锐
+"""
+import argparse
+import time
+
+from fs_catalog import CATALOG_PATH, SCAN_WORKERS, open_catalog, build_catalog
+
+# 需要建立索引的根目录
+root_dirs = [
+    r"D:\School\SophomoreStudyMaterials\00MachineLearning\7.fuwuqi\DATA",
+]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="构建 / 刷新工作目录索引")
+    parser.add_argument("roots", nargs="*", default=root_dirs, help="根目录，可传多个")
+    parser.add_argument("--catalog", default=CATALOG_PATH, help="索引 SQLite 文件路径")
+    parser.add_argument("--workers", type=int, default=SCAN_WORKERS, help="并行扫描的线程数")
+    parser.add_argument("--full", action="store_true", help="忽略已有索引，全部重新扫描")
+    args = parser.parse_args()
+
+    conn = open_catalog(args.catalog)
+    for root in args.roots:
+        start = time.perf_counter()
+        stats = build_catalog(conn, root, workers=args.workers, full=args.full)
+        print(f"✅ {root}：共 {stats['dirs']} 个目录，重新扫描 {stats['rescanned']} 个，"
+              f"移除 {stats['removed']} 个，用时 {time.perf_counter() - start:.1f} 秒")
+    conn.close()
@@ -1,7 +1,10 @@
+import argparse
 import os
-import shutil
 from glob import glob
 
+from move_engine import (JOURNAL_PATH, MOVE_WORKERS, MoveJournal, plan_moves, run_moves, resume_run,
+                         rollback_run, new_run_id)
+
 # 定义源文件夹路径列表
 folder_paths = [
     r"D:\School\SophomoreStudyMaterials\00MachineLearning\7.fuwuqi\work (1)\work",
@@ -10,25 +13,49 @@ folder_paths = [
 # 目标路径（移动到的目录）
 target_dir = r"D:\School\SophomoreStudyMaterials\00MachineLearning\7.fuwuqi\DATA\origin-ThB5-all\B-221\02-origin-ThB5_12_34_221\S3-origin-ThB5-Alk+Tran_12_34_221"
 
-# 确保目标目录存在（测试阶段也可以注释，仅打印路径）
-os.makedirs(target_dir, exist_ok=True)
-
-# 遍历每个源文件夹
-for base_path in folder_paths:
-    # 构建匹配模式：base_path下所有"*-*"子文件夹中的"ID-*"
-    pattern = os.path.join(base_path, "*-*", "ID-*")
-    # 匹配所有符合条件的路径
-    matched_paths = glob(pattern)
-
-    # 遍历匹配到的路径并移动
-    for src_path in matched_paths:
-        # 获取源路径的最后一级名称（用于目标路径）
-        src_name = os.path.basename(src_path)
-        dest_path = os.path.join(target_dir, src_name)
-
-        try:
-            # 移动路径（文件或文件夹均可）
-            shutil.move(src_path, dest_path)
-            print(f"成功移动：{src_path} -> {dest_path}")
-        except Exception as e:
-            print(f"移动失败 {src_path}：{str(e)}")
+# 移动通过 move_engine 完成：先规划全部移动，同盘直接 os.rename，跨盘在线程池中复制后删除源；
+# 每一步都记录在 move_journal.sqlite 中，中断后可 --resume 继续或 --rollback 撤销
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="把 */*-*/ID-* 移动到目标目录")
+    parser.add_argument("--dry-run", action="store_true", help="只打印移动计划（测试阶段使用）")
+    parser.add_argument("--workers", type=int, default=MOVE_WORKERS, help="跨盘移动的并发数")
+    parser.add_argument("--journal", default=JOURNAL_PATH, help="移动日志 SQLite 文件")
+    parser.add_argument("--resume", metavar="RUN_ID", help="继续执行中断的移动")
+    parser.add_argument("--rollback", metavar="RUN_ID", help="撤销某次移动")
+    parser.add_argument("--runs", action="store_true", help="列出日志中的所有移动记录")
+    args = parser.parse_args()
+
+    journal = MoveJournal(args.journal)
+    if args.runs:
+        for run_id, state, count in journal.runs():
+            print(f"{run_id}\t{state}\t{count}")
+        raise SystemExit(0)
+    if args.resume:
+        print(f"继续执行 {args.resume}：{resume_run(journal, args.resume, args.workers)}")
+        raise SystemExit(0)
+    if args.rollback:
+        print(f"已撤销 {args.rollback}：恢复 {rollback_run(journal, args.rollback)} 项")
+        raise SystemExit(0)
+
+    # 遍历每个源文件夹
+    pairs = []
+    for base_path in folder_paths:
+        # 构建匹配模式：base_path下所有"*-*"子文件夹中的"ID-*"
+        pattern = os.path.join(base_path, "*-*", "ID-*")
+        # 匹配所有符合条件的路径，目标路径使用源路径的最后一级名称
+        for src_path in glob(pattern):
+            pairs.append((src_path, os.path.join(target_dir, os.path.basename(src_path))))
+
+    moves, conflicts = plan_moves(pairs)
+    for src_path, dest_path in conflicts:
+        print(f"⚠️ 目标已存在或与其他源重复，跳过：{src_path} -> {dest_path}")
+    for move in moves:
+        print(f"[{move['method']}] {move['src']} -> {move['dst']}")
+    if args.dry_run or not moves:
+        raise SystemExit(0)
+
+    # 确保目标目录存在
+    os.makedirs(target_dir, exist_ok=True)
+    run_id = new_run_id()
+    counts = run_moves(journal, run_id, moves, args.workers)
+    print(f"✅ 移动完成（日志编号 {run_id}）：{counts}")
@@ -1,11 +1,22 @@
-import os
+import argparse
+
+from fs_catalog import CATALOG_PATH, open_catalog, build_catalog, is_cataloged, find_dirs_by_name
 
 # 目标文件夹路径
 a = r"D:\School\SophomoreStudyMaterials\00MachineLearning\7.fuwuqi\DATA\origin-ThB5-Alk+Alk-123-4"
 
-# 遍历文件夹下所有文件
-# 只查找直接子文件夹（不递归）
-for item in os.listdir(a):
-    item_path = os.path.join(a, item)
-    if os.path.isdir(item_path) and "4B20" in item:
-        print(item_path)
\ No newline at end of file
+# 只查找直接子文件夹（不递归），从目录索引中查询（先用 05-构建目录索引.py 建立；尚未建立时自动扫描）
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="查找名称包含关键字的子文件夹")
+    parser.add_argument("keyword", nargs="?", default="4B20")
+    parser.add_argument("--dir", default=a, help="目标文件夹")
+    parser.add_argument("--catalog", default=CATALOG_PATH, help="索引 SQLite 文件路径")
+    parser.add_argument("--refresh", action="store_true", help="查询前先增量刷新索引")
+    args = parser.parse_args()
+
+    conn = open_catalog(args.catalog)
+    if args.refresh or not is_cataloged(conn, args.dir):
+        build_catalog(conn, args.dir)
+
+    for item_path in find_dirs_by_name(conn, args.dir, args.keyword):
+        print(item_path)
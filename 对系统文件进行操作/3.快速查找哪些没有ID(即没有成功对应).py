@@ -1,74 +1,80 @@
+import argparse
 import os
-import shutil
+
+from fs_catalog import (CATALOG_PATH, open_catalog, build_catalog, find_work_dirs_without_id,
+                        has_id_subdir, forget_tree)
+from move_engine import JOURNAL_PATH, MOVE_WORKERS, MoveJournal, plan_moves, run_moves, new_run_id
 
 # 设置路径
 root_dir = r"D:\School\SophomoreStudyMaterials\00MachineLearning\7.fuwuqi\work_100-199"
 target_move_dir = r"D:\School\SophomoreStudyMaterials\00MachineLearning\7.fuwuqi\work_Alk+poor_需要复原"
 
-# 存储需要移动的目录
-missing_id_dirs = []
-
-print("正在扫描目录...")
-
-# 遍历 root_dir 下的所有子目录
-for entry in os.scandir(root_dir):
-    if entry.is_dir():
-        dir_name = entry.name
-
-        # 判断目录名是否包含 '-'（即符合 */*-*/ 形式）
-        if '-' in dir_name:
-            target_path = entry.path
-            has_id_subdir = False
+# 从目录索引中查询 root_dir 下名称含 '-'（即符合 */*-*/ 形式）且没有 ID- 开头子目录的目录：
+# - 本脚本会移动目录，查询前默认先增量刷新索引（只重新列出 mtime 变化的目录），
+#   避免 012 之后新建的 ID-n/ 未进入索引，导致已入库的目录被误移；
+#   root_dir 尚未建立索引时即为首次扫描，不会把 "未扫描" 误当作 "全部都有 ID"
+# - 确认后、移动前再逐个 scandir 复核，移动成功的目录从索引中删除
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="查找没有 ID- 子目录的工作目录并移动")
+    parser.add_argument("--catalog", default=CATALOG_PATH, help="索引 SQLite 文件路径")
+    parser.add_argument("--no-refresh", action="store_true",
+                        help="不刷新索引，直接按现有索引查询（移动前仍会逐个复核）")
+    parser.add_argument("--workers", type=int, default=MOVE_WORKERS, help="跨盘移动的并发数")
+    parser.add_argument("--journal", default=JOURNAL_PATH, help="移动日志（中断后用 1.移动ID到想要的位置.py --resume 继续）")
+    args = parser.parse_args()
 
-            # 遍历该目录下的所有子项，检查是否有以 ID- 开头的【子目录】
-            try:
-                for sub_entry in os.scandir(target_path):
-                    if sub_entry.is_dir() and sub_entry.name.startswith("ID-"):
-                        has_id_subdir = True
-                        break
-            except PermissionError as e:
-                print(f"⚠️ 无法访问 {target_path}：权限不足，跳过。")
-                continue
+    conn = open_catalog(args.catalog)
+    if not args.no_refresh:
+        print("正在刷新目录索引...")
+        build_catalog(conn, root_dir)
 
-            # 如果没有找到 ID- 开头的子目录，标记为需要移动
-            if not has_id_subdir:
-                missing_id_dirs.append(entry.path)
+    missing_id_dirs = find_work_dirs_without_id(conn, root_dir)
 
-# 输出结果并移动
-print("\n" + "=" * 60)
-if missing_id_dirs:
-    print("以下目录不包含以 'ID-' 开头的子目录，将被移动：")
-    for dir_path in missing_id_dirs:
-        dir_name = os.path.basename(dir_path)
-        print(f"  {dir_name}")
+    # 输出结果并移动
+    print("\n" + "=" * 60)
+    if missing_id_dirs:
+        print("以下目录不包含以 'ID-' 开头的子目录，将被移动：")
+        for dir_path in missing_id_dirs:
+            dir_name = os.path.basename(dir_path)
+            print(f"  {dir_name}")
 
-    print(f"\n共 {len(missing_id_dirs)} 个目录将从:")
-    print(f"  {root_dir}")
-    print(f"移动到:")
-    print(f"  {target_move_dir}")
+        print(f"\n共 {len(missing_id_dirs)} 个目录将从:")
+        print(f"  {root_dir}")
+        print(f"移动到:")
+        print(f"  {target_move_dir}")
 
-    # 确认是否继续（可选，防止误操作）
-    confirm = input("\n确认移动？(y/N): ").strip().lower()
-    if confirm not in ('y', 'yes'):
-        print("操作已取消。")
-        exit()
+        # 确认是否继续（可选，防止误操作）
+        confirm = input("\n确认移动？(y/N): ").strip().lower()
+        if confirm not in ('y', 'yes'):
+            print("操作已取消。")
+            raise SystemExit(0)
 
-    # 开始移动
-    for dir_path in missing_id_dirs:
-        dir_name = os.path.basename(dir_path)
-        dest_path = os.path.join(target_move_dir, dir_name)
+        # 复核：索引查询之后（例如等待确认期间）已出现 ID- 子目录或已不存在的目录不移动
+        confirmed = []
+        for dir_path in missing_id_dirs:
+            if not os.path.isdir(dir_path):
+                print(f"⚠️ 目录已不存在，跳过: {os.path.basename(dir_path)}")
+            elif has_id_subdir(dir_path):
+                print(f"⚠️ 目录已有 ID- 子目录，跳过: {os.path.basename(dir_path)}")
+            else:
+                confirmed.append(dir_path)
 
-        # 如果目标位置已存在同名目录，跳过或重命名
-        if os.path.exists(dest_path):
-            print(f"⚠️ 目标已存在，跳过: {dir_name}")
-            continue
+        # 开始移动：同盘 os.rename，跨盘并行复制后删除源，每一步记录到移动日志
+        # 如果目标位置已存在同名目录，跳过
+        moves, conflicts = plan_moves(
+            [(dir_path, os.path.join(target_move_dir, os.path.basename(dir_path))) for dir_path in confirmed]
+        )
+        for dir_path, dest_path in conflicts:
+            print(f"⚠️ 目标已存在或与其他源重复，跳过: {os.path.basename(dir_path)}")
 
-        try:
-            shutil.move(dir_path, dest_path)
-            print(f"✅ 已移动: {dir_name}")
-        except Exception as e:
-            print(f"❌ 移动失败 {dir_name}: {str(e)}")
-else:
-    print("所有符合条件的目录都包含 'ID-' 子目录，无需移动。")
+        run_id = new_run_id()
+        counts = run_moves(MoveJournal(args.journal), run_id, moves, args.workers)
+        # 已移走的目录从索引中删除，下次查询不会再列出
+        for move in moves:
+            if move["state"] == "done":
+                forget_tree(conn, move["src"])
+        print(f"✅ 已移动 {counts.get('done', 0)} 个目录（日志编号 {run_id}）：{counts}")
+    else:
+        print("所有符合条件的目录都包含 'ID-' 子目录，无需移动。")
 
-print("=" * 60)
\ No newline at end of file
+    print("=" * 60)
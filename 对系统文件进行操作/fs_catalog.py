@@ -0,0 +1,258 @@
+"""
+工作目录的本地文件系统目录索引（SQLite），供 对系统文件进行操作 下的脚本共同使用。
+
+📌 说明：
+- build_catalog 以线程池并行 os.scandir 遍历一次目录树，把每个目录写入 SQLite：
+    - dirs：所有目录（路径、上级目录、修改时间），用于增量刷新
+    - work_dirs：名称含 "-" 的工作目录（化学式、CONTCAR / gamma-figsum.png / omega.dat 是否存在）
+    - id_dirs：ID-* 目录（entry_num、所在的上级目录、附件是否存在）
+- 增量刷新：目录的 mtime 与索引中一致时不再列出其内容（只 stat 一次），只有新增 / 删除 / 改名过
+  子项的目录才会重新 scandir；索引中存在但已不在磁盘上的目录会被删除
+- 查询函数（find_id_dirs / find_dirs_by_name / find_work_dirs_without_id / find_unmatched_work_dirs）
+  都走 SQLite 索引；查询的目录从未建立索引时抛出 LookupError（而不是返回空结果），
+  脚本用 is_cataloged 判断后先 build_catalog
+- ID 目录与原脚本一致，按名称以 "ID-" 开头判断；编号部分不是数字时 entry_num 为空
+- 会移动 / 删除目录的脚本在操作前用 has_id_subdir 直接读磁盘复核，操作后用 forget_tree 删除对应记录
+
+❗ 注意：文件原地改写不会改变所在目录的 mtime，CONTCAR 的修改时间只在该目录被重新扫描时更新；
+   需要完全准确时使用 full=True 全量重建。
+"""
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timezone
+import os
+import re
+import sqlite3
+
+CATALOG_PATH = "fs_catalog.sqlite"
+SCAN_WORKERS = 16
+
+ID_DIR_PREFIX = "ID-"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    name TEXT,
+    root TEXT,
+    mtime_ns INTEGER,
+    scanned_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_dirs_parent ON dirs(parent);
+CREATE INDEX IF NOT EXISTS idx_dirs_root ON dirs(root);
+
+CREATE TABLE IF NOT EXISTS work_dirs (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    name TEXT,
+    formula TEXT,
+    has_contcar INTEGER,
+    has_gamma INTEGER,
+    has_omega INTEGER,
+    mtime_ns INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_work_dirs_parent ON work_dirs(parent);
+CREATE INDEX IF NOT EXISTS idx_work_dirs_formula ON work_dirs(formula);
+CREATE INDEX IF NOT EXISTS idx_work_dirs_name ON work_dirs(name);
+
+CREATE TABLE IF NOT EXISTS id_dirs (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    entry_id TEXT,
+    entry_num INTEGER,
+    has_vasp INTEGER,
+    has_gamma INTEGER,
+    has_omega INTEGER,
+    mtime_ns INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_id_dirs_parent ON id_dirs(parent);
+CREATE INDEX IF NOT EXISTS idx_id_dirs_entry_num ON id_dirs(entry_num);
+"""
+
+
+def extract_formula(name):
+    """从目录名提取化学式（与 012 的 extract_formula_from_path 规则一致）"""
+    matches = re.findall(r'([A-Z][a-z]?(?:\d*[A-Z][a-z]?\d*)*)', name)
+    matches.sort(key=len, reverse=True)
+    for candidate in matches:
+        if len(re.findall(r'([A-Z][a-z]?)', candidate)) >= 2 and re.fullmatch(r'([A-Z][a-z]?\d*)+', candidate):
+            return candidate
+    return None
+
+
+def open_catalog(path=CATALOG_PATH):
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _scan_one(path, known_mtime):
+    """
+    扫描单个目录（在线程池中运行）
+
+    返回 (path, mtime_ns, subdirs, files)；目录 mtime 未变化时 subdirs / files 为 None
+    """
+    mtime_ns = os.stat(path).st_mtime_ns
+    if known_mtime == mtime_ns:
+        return path, mtime_ns, None, None
+    subdirs, files = [], []
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.name)
+            else:
+                files.append(entry.name)
+    return path, mtime_ns, subdirs, files
+
+
+def _record_dir(conn, root, path, mtime_ns, subdirs, files, now):
+    parent, name = os.path.split(path)
+    conn.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?, ?, ?)",
+                 (path, parent, name, root, mtime_ns, now))
+    files = set(files)
+    if name.startswith(ID_DIR_PREFIX):
+        number = name[len(ID_DIR_PREFIX):]
+        conn.execute(
+            "INSERT OR REPLACE INTO id_dirs VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, parent, name, int(number) if number.isdigit() else None,
+             int(any(f.endswith(".vasp") for f in files)),
+             int("gamma-figsum.png" in files), int("omega.dat" in files), mtime_ns),
+        )
+    elif "-" in name:
+        conn.execute(
+            "INSERT OR REPLACE INTO work_dirs VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, parent, name, extract_formula(name), int("CONTCAR" in files),
+             int("gamma-figsum.png" in files), int("omega.dat" in files), mtime_ns),
+        )
+
+
+def _forget(conn, paths):
+    for table in ("dirs", "work_dirs", "id_dirs"):
+        conn.executemany(f"DELETE FROM {table} WHERE path = ?", ((p,) for p in paths))
+
+
+def _under(root):
+    """SQL 条件：路径位于 root 之下"""
+    root = os.path.abspath(root).rstrip(os.sep) + os.sep
+    return "path >= ? AND path < ?", (root, root[:-1] + chr(ord(os.sep) + 1))
+
+
+def build_catalog(conn, root, workers=SCAN_WORKERS, full=False):
+    """
+    扫描（或增量刷新）root 下的目录树，返回 {"dirs", "rescanned", "removed"} 统计
+    """
+    root = os.path.abspath(root)
+    # 按路径前缀（而不是 root 字段）取已有记录，刷新子目录树与刷新上级目录共用同一份索引
+    where, params = _under(root)
+    rows = conn.execute(f"SELECT path, parent, mtime_ns FROM dirs WHERE path = ? OR ({where})",
+                        (root,) + params).fetchall()
+    known = {path: mtime_ns for path, _, mtime_ns in rows}
+    children = {}
+    for path, parent, _ in rows:
+        children.setdefault(parent, []).append(path)
+    if full:
+        known_mtimes = {}
+    else:
+        known_mtimes = known
+
+    now = datetime.now(timezone.utc).isoformat()
+    visited = set()
+    rescanned = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {executor.submit(_scan_one, root, known_mtimes.get(root))}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    path, mtime_ns, subdirs, files = future.result()
+                except OSError as e:
+                    print(f"⚠️ 无法访问目录，跳过：{e}")
+                    continue
+                visited.add(path)
+                if subdirs is None:
+                    # 目录内容未变化：沿用索引中的子目录列表，继续检查子目录
+                    subpaths = children.get(path, [])
+                else:
+                    rescanned += 1
+                    _record_dir(conn, root, path, mtime_ns, subdirs, files, now)
+                    subpaths = [os.path.join(path, name) for name in subdirs]
+                for sub in subpaths:
+                    pending.add(executor.submit(_scan_one, sub, known_mtimes.get(sub)))
+
+    # 索引中有、磁盘上已不存在（或无法访问）的目录
+    removed = [path for path in known if path not in visited]
+    _forget(conn, removed)
+    conn.commit()
+    return {"dirs": len(visited), "rescanned": rescanned, "removed": len(removed)}
+
+
+def forget_tree(conn, path):
+    """从索引中删除 path 及其下所有目录的记录（目录被移走后调用）"""
+    path = os.path.abspath(path)
+    where, params = _under(path)
+    for table in ("dirs", "work_dirs", "id_dirs"):
+        conn.execute(f"DELETE FROM {table} WHERE path = ? OR ({where})", (path,) + params)
+    conn.commit()
+
+
+def has_id_subdir(path):
+    """不经过索引，直接 scandir 判断 path 下是否有 ID-* 子目录"""
+    with os.scandir(path) as it:
+        return any(entry.name.startswith(ID_DIR_PREFIX) and entry.is_dir(follow_symlinks=False) for entry in it)
+
+
+def is_cataloged(conn, root):
+    """root 是否已建立索引"""
+    return conn.execute("SELECT 1 FROM dirs WHERE path = ?", (os.path.abspath(root),)).fetchone() is not None
+
+
+def _require_cataloged(conn, root):
+    # 未建立索引的目录查询结果为空，会被误认为 "没有符合条件的目录"
+    if not is_cataloged(conn, root):
+        raise LookupError(f"目录索引中没有 {root}，请先运行 05-构建目录索引.py 或加 --refresh")
+
+
+def find_id_dirs(conn, root):
+    """root 下（所有层级）的 ID-* 目录，按编号排序"""
+    _require_cataloged(conn, root)
+    where, params = _under(root)
+    return conn.execute(f"SELECT path, entry_id FROM id_dirs WHERE {where} ORDER BY entry_num, entry_id",
+                        params).fetchall()
+
+
+def find_dirs_by_name(conn, parent, keyword):
+    """parent 的直接子目录中名称包含 keyword 的目录"""
+    _require_cataloged(conn, parent)
+    rows = conn.execute("SELECT path FROM dirs WHERE parent = ? AND instr(name, ?) > 0 ORDER BY name",
+                        (os.path.abspath(parent), keyword))
+    return [row[0] for row in rows]
+
+
+def find_work_dirs_without_id(conn, parent):
+    """parent 的直接子目录中没有 ID-* 子目录的工作目录"""
+    _require_cataloged(conn, parent)
+    rows = conn.execute(
+        """
+        SELECT w.path FROM work_dirs w
+        WHERE w.parent = ?
+          AND NOT EXISTS (SELECT 1 FROM id_dirs i WHERE i.parent = w.path)
+        ORDER BY w.name
+        """,
+        (os.path.abspath(parent),),
+    )
+    return [row[0] for row in rows]
+
+
+def find_unmatched_work_dirs(conn, root):
+    """root 下（所有层级）含 CONTCAR 但没有 ID-* 子目录的工作目录"""
+    _require_cataloged(conn, root)
+    where, params = _under(root)
+    rows = conn.execute(
+        f"""
+        SELECT w.path FROM work_dirs w
+        WHERE {where.replace("path", "w.path")} AND w.has_contcar = 1
+          AND NOT EXISTS (SELECT 1 FROM id_dirs i WHERE i.parent = w.path)
+        ORDER BY w.path
+        """,
+        params,
+    )
+    return [row[0] for row in rows]
@@ -0,0 +1,228 @@
+"""
+带日志的并行移动引擎，供 1.移动ID到想要的位置 与 3.快速查找哪些没有ID 使用。
+
+📌 说明：
+- plan_moves 先规划所有移动：目标已存在、或多个源指向同一目标的都标记为冲突跳过；源与目标在同一文件系统时
+  用原子的 os.rename，跨盘时用 "复制到本次移动专属的临时目录 → 改名为目标 → 删除源" 三步完成
+- 跨盘移动在有界线程池中执行；每一步状态都写入 SQLite 日志（move_journal.sqlite）：
+    planned → copying → renaming → copied → done（失败为 failed，回滚后为 rolled_back）
+- 目标是否由本次移动创建只以日志为准（renaming 之后才可能出现），不根据目标是否存在推断；
+  只有日志确认目标由本次创建后才删除源
+- 中断后 resume_run 按日志继续；rollback_run 只把日志确认已完成的移动移回原位置
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import os
+import shutil
+import sqlite3
+import threading
+import uuid
+
+JOURNAL_PATH = "move_journal.sqlite"
+MOVE_WORKERS = 4
+TMP_SUFFIX = ".moving"
+
+
+class MoveJournal:
+    def __init__(self, path=JOURNAL_PATH):
+        # 跨盘移动在线程池中更新状态，连接在线程间共享，用锁串行化写入
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS moves (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                run_id TEXT,
+                src TEXT,
+                dst TEXT,
+                method TEXT,
+                state TEXT,
+                error TEXT,
+                updated_at TEXT
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_moves_run ON moves(run_id, state)")
+        self.conn.commit()
+
+    def add(self, run_id, move):
+        with self.lock:
+            cur = self.conn.execute(
+                "INSERT INTO moves (run_id, src, dst, method, state, updated_at) VALUES (?, ?, ?, ?, 'planned', ?)",
+                (run_id, move["src"], move["dst"], move["method"], datetime.now(timezone.utc).isoformat()),
+            )
+            self.conn.commit()
+        move["id"] = cur.lastrowid
+        move["state"] = "planned"
+
+    def set_state(self, move, state, error=None):
+        with self.lock:
+            self.conn.execute("UPDATE moves SET state = ?, error = ?, updated_at = ? WHERE id = ?",
+                              (state, error, datetime.now(timezone.utc).isoformat(), move["id"]))
+            self.conn.commit()
+        move["state"] = state
+
+    def load(self, run_id, states=None):
+        query = "SELECT id, src, dst, method, state FROM moves WHERE run_id = ?"
+        params = [run_id]
+        if states:
+            query += f" AND state IN ({','.join('?' * len(states))})"
+            params.extend(states)
+        rows = self.conn.execute(query + " ORDER BY id", params).fetchall()
+        return [dict(zip(("id", "src", "dst", "method", "state"), row)) for row in rows]
+
+    def runs(self):
+        return self.conn.execute(
+            "SELECT run_id, state, COUNT(*) FROM moves GROUP BY run_id, state ORDER BY run_id"
+        ).fetchall()
+
+
+def _device(path):
+    """path 所在文件系统的设备号（path 不存在时取最近的已存在上级目录）"""
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        path = os.path.dirname(path)
+    return os.stat(path).st_dev
+
+
+def plan_moves(pairs):
+    """
+    规划移动，返回 (moves, conflicts)
+
+    参数:
+        pairs: [(src, dst), ...]
+    """
+    moves, conflicts = [], []
+    targets = {}
+    for src, dst in pairs:
+        targets[dst] = targets.get(dst, 0) + 1
+    for src, dst in pairs:
+        # 多个源指向同一目标时全部跳过，避免后一个被当作 "已完成" 而删除源
+        if os.path.exists(dst) or targets[dst] > 1:
+            conflicts.append((src, dst))
+            continue
+        method = "rename" if _device(src) == _device(os.path.dirname(dst)) else "copy"
+        moves.append({"src": src, "dst": dst, "method": method})
+    return moves, conflicts
+
+
+def _copy(src, dst):
+    if os.path.isdir(src):
+        shutil.copytree(src, dst, symlinks=True)
+    else:
+        shutil.copy2(src, dst)
+
+
+def _remove(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    elif os.path.lexists(path):
+        os.remove(path)
+
+
+def _tmp_path(path, move):
+    """本次移动专属的临时路径（含日志中的移动编号），不会与其他移动或其他目录冲突"""
+    return f"{path}{TMP_SUFFIX}-{move['id']}"
+
+
+def _execute(journal, move):
+    """
+    执行（或继续执行）单个移动
+
+    - renaming：临时目录（或同盘移动的源）即将改名为目标。中断后若源 / 临时目录已不在而目标存在，
+      说明改名已完成，目标由本次创建
+    - copied：日志确认目标由本次创建，只剩删除源（源可能只删了一半，但目标是完整的）
+    - 其余状态下目标若已存在，一律视为冲突，不删除源
+    """
+    src, dst = move["src"], move["dst"]
+    if move["state"] == "done":
+        return move
+    staged = src if move["method"] == "rename" else _tmp_path(dst, move)
+    try:
+        if move["state"] == "renaming" and not os.path.lexists(staged) and os.path.exists(dst):
+            journal.set_state(move, "copied")
+        if move["state"] != "copied":
+            if move["state"] != "renaming" or not os.path.lexists(staged):
+                if move["method"] == "copy":
+                    journal.set_state(move, "copying")
+                    _remove(staged)  # 本次移动上次中断留下的不完整副本
+                    _copy(src, staged)
+            if os.path.lexists(dst):
+                raise FileExistsError(f"目标已存在且不是本次移动创建的：{dst}")
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            journal.set_state(move, "renaming")
+            os.rename(staged, dst)  # 同一目录 / 同一文件系统内改名，目标要么完整存在要么不存在
+            journal.set_state(move, "copied")
+        _remove(src)
+        journal.set_state(move, "done")
+    except Exception as e:
+        # copied / renaming 保持原状态，resume 时按日志继续；其余记为 failed
+        move["error"] = f"{type(e).__name__}: {e}"
+        state = move["state"] if move["state"] in ("copied", "renaming") else "failed"
+        journal.set_state(move, state, move["error"])
+    return move
+
+
+def run_moves(journal, run_id, moves, workers=MOVE_WORKERS):
+    """先在主线程完成所有同盘 rename，再把跨盘移动交给有界线程池；返回各状态的数量"""
+    for move in moves:
+        if "id" not in move:
+            journal.add(run_id, move)
+    for move in moves:
+        if move["method"] == "rename":
+            _execute(journal, move)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda m: _execute(journal, m), [m for m in moves if m["method"] == "copy"]))
+
+    counts = {}
+    for move in moves:
+        counts[move["state"]] = counts.get(move["state"], 0) + 1
+        if move.get("error"):
+            print(f"❌ 移动失败 {move['src']}：{move['error']}")
+    return counts
+
+
+def resume_run(journal, run_id, workers=MOVE_WORKERS):
+    """继续执行日志中未完成（含失败）的移动"""
+    moves = journal.load(run_id, ["planned", "copying", "renaming", "copied", "failed"])
+    return run_moves(journal, run_id, moves, workers)
+
+
+def rollback_run(journal, run_id):
+    """
+    按相反顺序撤销本次移动，返回恢复的数量
+
+    只有日志确认目标由本次创建的移动（copied / done，或改名已完成的 renaming）才会把目标移回原位置；
+    planned / copying / failed 的移动只清理本次的临时目录，不触碰目标路径上的内容
+    """
+    restored = 0
+    moves = journal.load(run_id, ["planned", "copying", "renaming", "copied", "done", "failed"])
+    for move in reversed(moves):
+        src, dst = move["src"], move["dst"]
+        staged = src if move["method"] == "rename" else _tmp_path(dst, move)
+        try:
+            created = move["state"] in ("copied", "done") or (
+                move["state"] == "renaming" and not os.path.lexists(staged) and os.path.exists(dst))
+            if move["method"] == "copy":
+                _remove(staged)
+            if created:
+                # 源可能已部分删除：以目标为准移回
+                _remove(src)
+                if move["method"] == "rename":
+                    os.rename(dst, src)
+                else:
+                    restore_tmp = _tmp_path(src, move)
+                    _remove(restore_tmp)
+                    _copy(dst, restore_tmp)
+                    os.rename(restore_tmp, src)
+                    _remove(dst)
+                restored += 1
+            journal.set_state(move, "rolled_back")
+        except Exception as e:
+            print(f"❌ 回滚失败 {dst} -> {src}: {e}")
+    return restored
+
+
+def new_run_id():
+    # 加随机后缀，同一秒内启动的两次移动不会共用编号
+    return f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
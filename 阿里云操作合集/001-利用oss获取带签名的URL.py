@@ -1,15 +1,22 @@
-import oss2
+import argparse
 import json
 import os
 
+from oss_utils import make_signer
+
 # 读取配置文件（不提交到GitHub的敏感配置）
 with open("oss_config.json", "r") as f:
     config = json.load(f)["oss"]
 
-# 从配置中获取信息（不再硬编码）
-auth = oss2.Auth(config["access_key_id"], config["access_key_secret"])
-bucket = oss2.Bucket(auth, config["endpoint"], config["bucket_name"])
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="批量生成 OSS 签名 URL")
+    parser.add_argument("keys", nargs="*", default=["example.jpg"], help="对象 key，可传多个")
+    parser.add_argument("--offline", action="store_true", help="使用本地 FakeBucket 离线签名（不访问 OSS）")
+    args = parser.parse_args()
+
+    # 从配置中获取信息（不再硬编码）；有效期默认 600 秒，剩余不足 60 秒时重新签名
+    signer = make_signer(config, offline=args.offline)
 
-# 生成签名URL（有效期设为合理值，如600秒）
-url = bucket.sign_url('GET', 'example.jpg', 600)
-print(url)
\ No newline at end of file
+    # 生成签名URL（一次调用签多个 key）
+    for key, url in signer.sign_many(args.keys).items():
+        print(f"{key}\t{url}")
@@ -0,0 +1,176 @@
+"""
+🌟 脚本名称：ID 文件夹附件批量上传 OSS
+
+📌 功能概述：
+012 入库后会在每个工作目录下生成 ID-n/ 文件夹（{化学式}.vasp、gamma-figsum.png、omega.dat），
+本脚本遍历这些文件夹，用线程池并发上传到 OSS，对象 key 为 "ID-n/文件名"（与前端集合中的 image_key 一致）。
+
+🔧 核心功能：
+1. ✅ 远端对象大小与 ETag 已一致时跳过（不重复上传）
+2. ✅ 大文件（>= --multipart-threshold）走分片断点续传，中断后从已完成的分片继续
+3. ✅ 上传进度记录在本地日志 002-upload_journal.sqlite：文件大小与修改时间都没变的直接跳过，不再 HEAD
+4. ✅ 存储后端可替换：--local-root 指定目录时使用本地目录模拟的 Bucket，可完全离线运行和做性能测试
+
+🚀 使用示例：
+    python 002-附件批量上传OSS.py D:/.../work/work --workers 16
+    python 002-附件批量上传OSS.py ./work --local-root ./fake_oss
+
+📅 作者：张圳锐
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+import argparse
+import json
+import os
+import re
+import sqlite3
+import time
+
+from oss_utils import make_backend, simple_etag
+
+JOURNAL_PATH = "002-upload_journal.sqlite"
+CHECKPOINT_DIR = ".upload_checkpoints"
+MULTIPART_THRESHOLD = 64 * 1024 * 1024
+PART_SIZE = 8 * 1024 * 1024
+
+ID_DIR_PATTERN = re.compile(r"^ID-\d+$")
+
+
+# 本地上传日志：记录每个 key 已上传的源文件 stat 与远端 ETag
+class UploadJournal:
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS uploads (
+                object_key TEXT PRIMARY KEY,
+                local_path TEXT,
+                size INTEGER,
+                mtime_ns INTEGER,
+                etag TEXT,
+                uploaded_at TEXT
+            )
+            """
+        )
+
+    def get(self, key):
+        return self.conn.execute(
+            "SELECT size, mtime_ns, etag FROM uploads WHERE object_key = ?", (key,)
+        ).fetchone()
+
+    def record(self, task, etag):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO uploads VALUES (?, ?, ?, ?, ?, ?)",
+            (task["key"], task["path"], task["size"], task["mtime_ns"], etag,
+             datetime.now(timezone.utc).isoformat()),
+        )
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+def iter_tasks(roots, prefix=""):
+    """遍历工作目录下的 ID-n 文件夹，产出 {key, path, size, mtime_ns}"""
+    for root in roots:
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+            entry_id = os.path.basename(dirpath)
+            if not ID_DIR_PATTERN.match(entry_id):
+                continue
+            for name in sorted(filenames):
+                path = os.path.join(dirpath, name)
+                stat = os.stat(path)
+                yield {
+                    "key": f"{prefix}{entry_id}/{name}",
+                    "path": path,
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                }
+
+
+def upload_one(backend, task, journal_etag, multipart_threshold, part_size, checkpoint_dir):
+    """
+    上传单个文件，返回 (状态, etag)，状态为 "skipped" 或 "uploaded"
+
+    远端大小一致时：普通对象比较 MD5；分片对象（ETag 带 "-n"）无法由本地直接算出，
+    与日志中记录的 ETag 一致即视为相同。
+    """
+    remote = backend.head(task["key"])
+    if remote is not None and remote[0] == task["size"]:
+        remote_etag = remote[1]
+        if "-" in remote_etag:
+            if remote_etag == journal_etag:
+                return "skipped", remote_etag
+        elif remote_etag.upper() == simple_etag(task["path"]):
+            return "skipped", remote_etag
+
+    if task["size"] >= multipart_threshold:
+        etag = backend.multipart_upload(task["key"], task["path"], part_size, checkpoint_dir)
+    else:
+        etag = backend.put_file(task["key"], task["path"])
+    return "uploaded", etag
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ID 文件夹附件批量上传 OSS")
+    parser.add_argument("roots", nargs="+", help="012 的工作目录（包含 ID-n 文件夹）")
+    parser.add_argument("--oss-config", default="oss_config.json", help="OSS 配置文件")
+    parser.add_argument("--local-root", default=None, help="使用本地目录模拟的 Bucket（离线运行）")
+    parser.add_argument("--prefix", default="", help="对象 key 前缀，如 attachments/")
+    parser.add_argument("--workers", type=int, default=8, help="并发上传的线程数")
+    parser.add_argument("--multipart-threshold", type=int, default=MULTIPART_THRESHOLD,
+                        help="文件大小不小于该值（字节）时分片上传")
+    parser.add_argument("--part-size", type=int, default=PART_SIZE, help="分片大小（字节）")
+    parser.add_argument("--journal", default=JOURNAL_PATH, help="上传日志 SQLite 文件")
+    parser.add_argument("--force", action="store_true", help="忽略上传日志，逐个与远端比较")
+    args = parser.parse_args()
+
+    config = None
+    if not args.local_root:
+        with open(args.oss_config, "r") as f:
+            config = json.load(f)["oss"]
+    backend = make_backend(config, args.local_root)
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+    journal = UploadJournal(args.journal)
+
+    counts = {"uploaded": 0, "skipped": 0, "failed": 0}
+    uploaded_bytes = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {}
+        for task in iter_tasks(args.roots, args.prefix):
+            record = journal.get(task["key"])
+            # 源文件 stat 与日志一致：上次已上传成功，直接跳过（中断后重跑从这里继续）
+            if not args.force and record and record[0] == task["size"] and record[1] == task["mtime_ns"]:
+                counts["skipped"] += 1
+                continue
+            future = executor.submit(upload_one, backend, task, record[2] if record else None,
+                                     args.multipart_threshold, args.part_size, CHECKPOINT_DIR)
+            futures[future] = task
+
+        # 日志只在主线程写入（SQLite 连接不跨线程共享）
+        for i, future in enumerate(as_completed(futures), 1):
+            task = futures[future]
+            try:
+                status, etag = future.result()
+            except Exception as e:
+                counts["failed"] += 1
+                print(f"❌ 上传失败: {task['path']} -> {task['key']} ({e})")
+                continue
+            counts[status] += 1
+            if status == "uploaded":
+                uploaded_bytes += task["size"]
+            journal.record(task, etag)
+            if i % 100 == 0:
+                journal.commit()
+                print(f"已处理 {i}/{len(futures)} 个文件...")
+    journal.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ 完成：上传 {counts['uploaded']} 个，跳过 {counts['skipped']} 个，失败 {counts['failed']} 个；"
+          f"共 {uploaded_bytes / 1024 / 1024:.1f} MB，用时 {elapsed:.1f} 秒"
+          f"（{uploaded_bytes / 1024 / 1024 / max(elapsed, 1e-9):.1f} MB/s）")
@@ -0,0 +1,296 @@
+"""
+OSS 签名 URL 的公共工具，供 阿里云操作合集 下的脚本以及前端集合（MONGODB操作合集/frontend_view.py）使用。
+
+📌 当前包含：
+- SignedUrlCache：批量签名 + 进程内缓存，按剩余有效期淘汰（剩余不足 resign_before 秒时重新签名）
+- FakeBucket：本地离线签名（与 oss2 的 V1 查询串签名算法一致，只做 HMAC 计算，不访问网络），
+  没有 AccessKey 或需要离线调试时使用
+- make_bucket：根据 oss_config.json 创建 oss2.Bucket 或 FakeBucket
+- 上传后端（002 批量上传使用）：统一提供 head / put_file / multipart_upload / sign_url
+    - Oss2Backend：真实 OSS，大文件走 oss2.resumable_upload（断点续传）
+    - LocalDirBucket：以本地目录模拟 Bucket（含分片上传的断点续传），用于离线运行和性能测试
+"""
+from collections import OrderedDict
+from urllib.parse import quote, urlsplit
+import base64
+import hashlib
+import hmac
+import json
+import os
+import shutil
+import time
+
+# 默认签名有效期（秒）
+SIGN_EXPIRES = 600
+# 缓存中的 URL 剩余有效期少于该值时重新签名
+RESIGN_BEFORE = 60
+# 缓存最多保留的 URL 数
+MAX_CACHE_SIZE = 10000
+# 读取文件计算 MD5 的块大小
+READ_CHUNK = 1024 * 1024
+
+
+class FakeBucket:
+    """
+    本地假 Bucket：与 oss2.Bucket.sign_url 接口一致
+
+    签名串为 "GET\\n\\n\\n{expires}\\n/{bucket}/{key}"，HMAC-SHA1 后 base64，
+    与 oss2 的 V1 签名结果相同；URL 中的 key 与 oss2 一样整体编码（"/" 编码为 %2F），
+    可用于离线调试签名与缓存逻辑。
+    """
+
+    def __init__(self, access_key_id, access_key_secret, endpoint, bucket_name, clock=time.time):
+        self.access_key_id = access_key_id
+        self.access_key_secret = access_key_secret
+        self.bucket_name = bucket_name
+        parts = urlsplit(endpoint if "://" in endpoint else "https://" + endpoint)
+        self.scheme = parts.scheme
+        self.host = parts.netloc
+        self.clock = clock
+
+    def sign_url(self, method, key, expires, headers=None, params=None):
+        expires_at = int(self.clock()) + int(expires)
+        string_to_sign = f"{method}\n\n\n{expires_at}\n/{self.bucket_name}/{key}"
+        digest = hmac.new(self.access_key_secret.encode("utf-8"), string_to_sign.encode("utf-8"),
+                          hashlib.sha1).digest()
+        signature = base64.b64encode(digest).decode("utf-8")
+        # oss2 生成 URL 时对 key 使用 quote(key, '')，"/" 同样编码
+        return (f"{self.scheme}://{self.bucket_name}.{self.host}/{quote(key, safe='')}"
+                f"?OSSAccessKeyId={quote(self.access_key_id, safe='')}"
+                f"&Expires={expires_at}&Signature={quote(signature, safe='')}")
+
+
+class SignedUrlCache:
+    """
+    批量签名 URL 缓存
+
+    参数:
+        bucket: oss2.Bucket 或 FakeBucket（只需要 sign_url 方法）
+        expires: 每次签名的有效期（秒）
+        resign_before: 剩余有效期少于该值时视为过期，重新签名
+        max_size: 缓存条数上限，超过时先清理已过期的，再淘汰最久未使用的
+    """
+
+    def __init__(self, bucket, expires=SIGN_EXPIRES, resign_before=RESIGN_BEFORE,
+                 max_size=MAX_CACHE_SIZE, clock=time.time):
+        if resign_before >= expires:
+            raise ValueError("resign_before 必须小于 expires，否则每次都会重新签名")
+        self.bucket = bucket
+        self.expires = expires
+        self.resign_before = resign_before
+        self.max_size = max_size
+        self.clock = clock
+        self._cache = OrderedDict()  # (method, key) -> (url, expires_at)
+        self.hits = 0
+        self.misses = 0
+
+    def _fresh(self, entry, now):
+        return entry is not None and entry[1] - now >= self.resign_before
+
+    def _evict(self, now):
+        if len(self._cache) <= self.max_size:
+            return
+        for cache_key in [k for k, (_, expires_at) in self._cache.items() if expires_at - now < self.resign_before]:
+            del self._cache[cache_key]
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def sign(self, key, method="GET"):
+        return self.sign_many([key], method)[key]
+
+    def sign_many(self, keys, method="GET"):
+        """一次返回多个对象的签名 URL：{key: url}，缓存中仍然有效的直接复用"""
+        now = self.clock()
+        urls = {}
+        for key in keys:
+            if key in urls:
+                continue
+            cache_key = (method, key)
+            entry = self._cache.get(cache_key)
+            if self._fresh(entry, now):
+                self._cache.move_to_end(cache_key)
+                self.hits += 1
+            else:
+                entry = (self.bucket.sign_url(method, key, self.expires), now + self.expires)
+                self._cache[cache_key] = entry
+                self.misses += 1
+            urls[key] = entry[0]
+        self._evict(now)
+        return urls
+
+    def __len__(self):
+        return len(self._cache)
+
+
+def file_md5(path, offset=0, length=None):
+    """计算文件（或其中一段）的 MD5，返回 hashlib 对象"""
+    md5 = hashlib.md5()
+    remaining = os.path.getsize(path) - offset if length is None else length
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while remaining > 0:
+            chunk = f.read(min(READ_CHUNK, remaining))
+            if not chunk:
+                break
+            md5.update(chunk)
+            remaining -= len(chunk)
+    return md5
+
+
+def simple_etag(path):
+    """普通上传（PutObject）的 ETag：文件 MD5 的大写十六进制"""
+    return file_md5(path).hexdigest().upper()
+
+
+def multipart_etag(part_md5s):
+    """分片上传的 ETag：各分片 MD5 拼接后再取 MD5，加上 "-分片数" 后缀"""
+    digest = hashlib.md5(b"".join(bytes.fromhex(m) for m in part_md5s)).hexdigest().upper()
+    return f"{digest}-{len(part_md5s)}"
+
+
+class Oss2Backend:
+    """真实 OSS 后端"""
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+
+    def head(self, key):
+        """返回 (size, etag)，对象不存在时返回 None"""
+        import oss2
+        try:
+            meta = self.bucket.head_object(key)
+        except oss2.exceptions.NotFound:
+            return None
+        return meta.content_length, meta.etag
+
+    def put_file(self, key, path):
+        return self.bucket.put_object_from_file(key, path).etag
+
+    def multipart_upload(self, key, path, part_size, checkpoint_dir):
+        import oss2
+        result = oss2.resumable_upload(
+            self.bucket, key, path,
+            store=oss2.ResumableStore(root=checkpoint_dir),
+            multipart_threshold=part_size,
+            part_size=part_size,
+            num_threads=1,
+        )
+        return result.etag
+
+    def sign_url(self, method, key, expires):
+        return self.bucket.sign_url(method, key, expires)
+
+
+class LocalDirBucket(FakeBucket):
+    """
+    以本地目录模拟的 Bucket
+
+    对象保存在 root/<key>，ETag 与大小记录在 root/.meta/<key>.json；
+    分片上传把每个分片写入检查点目录并记录进度，中断后再次调用会跳过已完成的分片。
+    """
+
+    META_DIR = ".meta"
+
+    def __init__(self, root, bucket_name="local", endpoint="http://localhost",
+                 access_key_id="local", access_key_secret="local"):
+        super().__init__(access_key_id, access_key_secret, endpoint, bucket_name)
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _object_path(self, key):
+        return os.path.join(self.root, *key.split("/"))
+
+    def _meta_path(self, key):
+        return os.path.join(self.root, self.META_DIR, *key.split("/")) + ".json"
+
+    def _commit(self, key, src, etag):
+        target = self._object_path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp = target + ".uploading"
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, target)
+        meta_path = self._meta_path(key)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"size": os.path.getsize(target), "etag": etag}, f)
+        return etag
+
+    def head(self, key):
+        try:
+            with open(self._meta_path(key), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+        if not os.path.exists(self._object_path(key)):
+            return None
+        return meta["size"], meta["etag"]
+
+    def put_file(self, key, path):
+        return self._commit(key, path, simple_etag(path))
+
+    def multipart_upload(self, key, path, part_size, checkpoint_dir):
+        stat = os.stat(path)
+        ckpt_id = hashlib.sha1(f"{self.bucket_name}/{key}".encode("utf-8")).hexdigest()
+        state_path = os.path.join(checkpoint_dir, ckpt_id + ".json")
+        parts_dir = os.path.join(checkpoint_dir, ckpt_id + ".parts")
+        os.makedirs(parts_dir, exist_ok=True)
+
+        state = {"path": os.path.abspath(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                 "part_size": part_size, "parts": {}}
+        if os.path.exists(state_path):
+            with open(state_path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            # 源文件或分片大小变化时检查点作废，重新上传
+            if all(saved.get(k) == state[k] for k in ("path", "size", "mtime_ns", "part_size")):
+                state = saved
+
+        n_parts = max(1, -(-stat.st_size // part_size))
+        with open(path, "rb") as src:
+            for n in range(n_parts):
+                if str(n) in state["parts"]:
+                    continue
+                src.seek(n * part_size)
+                data = src.read(part_size)
+                with open(os.path.join(parts_dir, f"{n:05d}"), "wb") as part:
+                    part.write(data)
+                state["parts"][str(n)] = hashlib.md5(data).hexdigest()
+                tmp_state = state_path + ".tmp"
+                with open(tmp_state, "w", encoding="utf-8") as f:
+                    json.dump(state, f)
+                os.replace(tmp_state, state_path)
+
+        assembled = os.path.join(parts_dir, "assembled")
+        with open(assembled, "wb") as out:
+            for n in range(n_parts):
+                with open(os.path.join(parts_dir, f"{n:05d}"), "rb") as part:
+                    shutil.copyfileobj(part, out)
+        etag = self._commit(key, assembled, multipart_etag([state["parts"][str(n)] for n in range(n_parts)]))
+        shutil.rmtree(parts_dir, ignore_errors=True)
+        os.remove(state_path)
+        return etag
+
+
+def make_backend(config=None, local_root=None):
+    """local_root 不为空时使用本地目录后端，否则按 oss_config.json 连接真实 OSS"""
+    if local_root:
+        return LocalDirBucket(local_root)
+    return Oss2Backend(make_bucket(config))
+
+
+def make_bucket(config, offline=False):
+    """根据 oss_config.json 中的 "oss" 配置创建 Bucket；offline=True 时使用 FakeBucket"""
+    if offline:
+        return FakeBucket(config["access_key_id"], config["access_key_secret"],
+                          config["endpoint"], config["bucket_name"])
+    import oss2
+    auth = oss2.Auth(config["access_key_id"], config["access_key_secret"])
+    return oss2.Bucket(auth, config["endpoint"], config["bucket_name"])
+
+
+def make_signer(config, offline=False):
+    """按配置创建 SignedUrlCache（有效期与提前重签时间可在配置中覆盖）"""
+    return SignedUrlCache(
+        make_bucket(config, offline),
+        expires=config.get("sign_expires", SIGN_EXPIRES),
+        resign_before=config.get("resign_before", RESIGN_BEFORE),
+    )